@@ -0,0 +1,110 @@
+"""
+Pool d'onglets navigateur pour le crawler unifié (Crawl4AI).
+
+Un seul AsyncWebCrawler, une offre à la fois : le chemin navigateur, 5 à 10 fois
+plus lent qu'une requête HTTP, était entièrement séquentiel. Ici :
+✅ CRAWL_BROWSER_PAGES onglets réutilisés (sessions Crawl4AI), partagés par toutes les sources
+✅ plafond par hôte (CRAWL_BROWSER_PER_HOST) pour rester poli avec chaque site
+✅ même interface que le crawler (`arun(url, config)`) : les appelants n'ont pas à changer
+✅ statistiques : rendus, attente d'un onglet, occupation maximale
+✅ profil de rendu de la source (render_profile) installé sur l'onglet avant la navigation
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class BrowserPool:
+    """
+    Distribue les rendus sur un nombre fixe d'onglets d'un même navigateur.
+
+    Chaque onglet est une session Crawl4AI (`session_id`) : la page reste ouverte
+    d'un rendu à l'autre au lieu d'être recréée à chaque offre.
+    """
+
+    def __init__(self, crawler, size=None, per_host=None):
+        self.crawler = crawler
+        self.size = size or int(os.getenv("CRAWL_BROWSER_PAGES", "4"))
+        self.per_host = per_host or int(os.getenv("CRAWL_BROWSER_PER_HOST", "2"))
+        self._free: asyncio.Queue = asyncio.Queue()
+        for index in range(self.size):
+            self._free.put_nowait(f"pool-page-{index}")
+        self._per_host: Dict[str, asyncio.Semaphore] = {}
+        self._used = set()
+        # Profil attendu par URL en cours de rendu, et profil installé sur chaque onglet
+        self._pending: Dict[str, object] = {}
+        self._installed: Dict[int, tuple] = {}
+        strategy = getattr(crawler, "crawler_strategy", None)
+        if strategy is not None and hasattr(strategy, "set_hook"):
+            strategy.set_hook("before_goto", self._before_goto)
+        self.stats = {"renders": 0, "failures": 0, "wait_seconds": 0.0, "in_use": 0, "max_in_use": 0}
+
+    @asynccontextmanager
+    async def page(self, url: str):
+        """Onglet libre (session_id) pour `url`, dans la limite de l'hôte."""
+        host = urlparse(url).netloc if not url.startswith("raw:") else ""
+        host_sem = self._per_host.get(host)
+        if host_sem is None:
+            host_sem = self._per_host[host] = asyncio.Semaphore(self.per_host if host else self.size)
+        started = time.monotonic()
+        # Slot hôte d'abord : un onglet n'est pas immobilisé par un hôte saturé
+        async with host_sem:
+            session_id = await self._free.get()
+            self.stats["wait_seconds"] += time.monotonic() - started
+            self.stats["in_use"] += 1
+            self.stats["max_in_use"] = max(self.stats["max_in_use"], self.stats["in_use"])
+            self._used.add(session_id)
+            try:
+                yield session_id
+            finally:
+                self.stats["in_use"] -= 1
+                self._free.put_nowait(session_id)
+
+    async def _before_goto(self, page, context=None, url=None, **kwargs):
+        """Hook Crawl4AI : route de blocage du profil de la source, une fois par onglet."""
+        profile = self._pending.get(url)
+        installed = self._installed.get(id(page))
+        if profile is not None and (installed is None or installed[0] is not profile):
+            if installed is not None:
+                await installed[0].uninstall(page, installed[1])
+            self._installed[id(page)] = (profile, await profile.install(page))
+        return page
+
+    async def arun(self, url: str, config, profile=None):
+        """
+        crawler.arun sur un onglet du pool (les pages `raw:` n'ont pas de plafond d'hôte).
+        `profile` (RenderProfile) bloque les ressources inutiles et mesure le rendu.
+        """
+        async with self.page(url) as session_id:
+            self.stats["renders"] += 1
+            if profile is not None:
+                self._pending[url] = profile
+            started = time.monotonic()
+            try:
+                result = await self.crawler.arun(url, config=config.clone(session_id=session_id))
+            finally:
+                self._pending.pop(url, None)
+            if profile is not None:
+                profile.record_render(url, time.monotonic() - started)
+            if not result.success:
+                self.stats["failures"] += 1
+            return result
+
+    async def close(self) -> None:
+        """Ferme les onglets ouverts par le pool."""
+        strategy = getattr(self.crawler, "crawler_strategy", None)
+        for session_id in self._used:
+            try:
+                await strategy.kill_session(session_id)
+            except Exception as e:
+                print(f"[BROWSER] Fermeture de l'onglet {session_id} impossible: {e}")
+        self._used.clear()
+        self._installed.clear()
+
+    def summary(self) -> Dict[str, object]:
+        return {**self.stats, "size": self.size, "per_host": self.per_host,
+                "wait_seconds": round(self.stats["wait_seconds"], 2)}
@@ -0,0 +1,54 @@
+"""
+Profil de crawl d'une source pour le crawler unifié (Crawl4AI).
+
+Stratégies d'extraction et CrawlerRunConfig étaient reconstruits pour chaque
+listing et pour chaque offre. Ils sont désormais construits une fois par source,
+à la découverte, puis partagés par tout le run :
+✅ stratégies JsonCss du listing et du détail
+✅ configurations de rendu du listing et du détail (avec le profil de rendu de la source)
+✅ URL de base de la source pour résoudre les liens relatifs des listings
+"""
+
+from urllib.parse import urljoin
+
+from crawler.core.render_profile import get_render_profile
+from crawler.core.schema_compiler import get_compiled_schemas
+
+
+class CrawlProfile:
+    """Tout ce que le crawler unifié réutilise d'une page à l'autre pour une source."""
+
+    def __init__(self, source):
+        from crawl4ai import CacheMode, CrawlerRunConfig
+        from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+
+        self.source = source
+        self.name = source.name
+        self.schemas = get_compiled_schemas(source)
+        self.render = get_render_profile(source)
+        self.base_url = source.get_base_url()
+
+        listing_schema = self.schemas.listing.schema
+        detail_schema = self.schemas.detail.schema
+        self.listing_strategy = JsonCssExtractionStrategy(listing_schema)
+        self.detail_strategy = JsonCssExtractionStrategy(detail_schema)
+        # Le cache Crawl4AI ne revalide pas : on le contourne au profit de ResponseCache
+        self.listing_config = CrawlerRunConfig(
+            extraction_strategy=self.listing_strategy,
+            cache_mode=CacheMode.BYPASS,
+            exclude_external_links=True,
+            verbose=True,
+            **self.render.run_config_options(listing_schema)
+        )
+        self.detail_config = CrawlerRunConfig(
+            extraction_strategy=self.detail_strategy,
+            cache_mode=CacheMode.BYPASS,
+            exclude_external_links=True,
+            verbose=False,  # Moins verbeux pour les détails
+            # Attente du vrai contenu (timeout court), images exclues
+            **self.render.run_config_options(detail_schema)
+        )
+
+    def absolute_url(self, href: str) -> str:
+        """Lien d'un listing (relatif ou absolu) résolu sur l'URL de base de la source."""
+        return urljoin(self.base_url, href)
@@ -1,263 +1,736 @@
-import json
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 import asyncio
+import time
+from contextlib import asynccontextmanager, nullcontext
+from urllib.parse import urljoin, urlparse
+
+from crawler.core.executor import get_cpu_executor
+from crawler.core.export_spool import SpoolDrainer, get_export_spool
+from crawler.core.fetcher import Fetcher
+from crawler.core.frontier import (Frontier, PrioritySemaphore, age_in_days, get_source_yield,
+                                   record_source_yield, score, source_budget)
+from crawler.core.http_cache import ResponseCache
+from crawler.core.http_client import http_session
+from crawler.core.metrics import EXPORT_ROWS, EXPORT_SECONDS, LLM_SECONDS, OFFERS, RUN_SECONDS, get_metrics
+from crawler.core.pipeline import Pipeline, Stage
+from crawler.core.schema_compiler import get_compiled_schemas
+from crawler.utils.parser_backend import make_soup
+from crawler.core.scheduler import get_scheduler
+from crawler.core.sitemap import SitemapReader
+from crawler.core.source_abc import JsonApiSource
+from crawler.core.state_store import get_state_store
+
+
+class ConcurrencyLimiter:
+    """
+    Limite le nombre de requêtes simultanées.
+
+    Deux niveaux : une limite globale (partagée par tous les runners qui
+    reçoivent la même instance, slots servis par priorité d'URL) et une limite par hôte.
+    Configurable via CRAWL_MAX_CONCURRENCY et CRAWL_MAX_PER_HOST.
+    """
+
+    def __init__(self, max_concurrency=None, max_per_host=None):
+        self.max_concurrency = max_concurrency or int(os.getenv("CRAWL_MAX_CONCURRENCY", "8"))
+        self.max_per_host = max_per_host or int(os.getenv("CRAWL_MAX_PER_HOST", "4"))
+        self._global = PrioritySemaphore(self.max_concurrency)
+        self._per_host = {}
+
+    @asynccontextmanager
+    async def slot(self, url, priority=0.0):
+        host = urlparse(url).netloc
+        host_sem = self._per_host.get(host)
+        if host_sem is None:
+            host_sem = self._per_host[host] = asyncio.Semaphore(self.max_per_host)
+        # On prend d'abord le slot hôte pour ne pas bloquer un slot global en attendant
+        async with host_sem:
+            await self._global.acquire(priority)
+            try:
+                yield
+            finally:
+                self._global.release()
+
+
+# Nombre de workers par étape (surchargeable via CRAWL_<ETAPE>_WORKERS)
+STAGE_WORKERS = {
+    "fetch": "8",
+    "parse": "2",
+    "annotate": "2",
+    "enrich": "2",
+    "export": "4",
+}
+
+
+class PageTracker:
+    """
+    Suit les offres d'une page de listing jusqu'à ce que leur date soit connue.
+    La pagination n'attend que cette décision, pas l'enrichissement ni l'export.
+    Le curseur de reprise, lui, attend que chaque offre soit sortie du pipeline
+    (spoolée, exportée ou écartée) : `drained`.
+    """
+
+    def __init__(self):
+        self.pending = 0
+        self.has_recent = False
+        self._done = asyncio.Event()
+        self._done.set()
+        self.unsettled = 0
+        self._settled = asyncio.Event()
+        self._settled.set()
+
+    def add(self):
+        self.pending += 1
+        self._done.clear()
+        self.hold()
+
+    def hold(self):
+        """Offre dont la date est déjà connue : suivie jusqu'à sa sortie du pipeline seulement."""
+        self.unsettled += 1
+        self._settled.clear()
+
+    def settle(self):
+        self.unsettled -= 1
+        if self.unsettled <= 0:
+            self._settled.set()
+
+    async def drained(self):
+        await self._settled.wait()
+
+    def resolve(self, recent):
+        if recent:
+            self.has_recent = True
+        self.pending -= 1
+        if self.pending <= 0:
+            self._done.set()
+
+    async def wait(self):
+        await self._done.wait()
+        return self.has_recent
+
+
+class OfferJob:
+    """Une offre qui traverse le pipeline (fetch → parse → annotate → enrich → export)."""
+
+    __slots__ = ("uid", "offer", "detail_url", "page", "html", "decided", "settled", "revisit", "kind", "priority")
+
+    def __init__(self, uid, offer, detail_url, page, revisit=False, priority=0.0):
+        self.uid = uid
+        self.offer = offer
+        self.detail_url = detail_url
+        self.page = page
+        self.html = None
+        self.decided = False
+        self.settled = False
+        # Offre déjà exportée mais modifiée depuis (sitemap) : exportée même si ancienne
+        self.revisit = revisit
+        # Ordre de passage dans la frontière (et pour les slots globaux)
+        self.kind = "recheck" if revisit else "detail"
+        self.priority = priority
+
+    def settle(self):
+        """L'offre a quitté le pipeline (spoolée, exportée ou écartée) ; une seule fois."""
+        if self.page is not None and not self.settled:
+            self.settled = True
+            self.page.settle()
+
+    def frontier_entry(self):
+        """Entrée persistée quand le budget de la source reporte l'offre au run suivant."""
+        return self.detail_url, self.kind, self.priority, {"uid": self.uid, "offer": self.offer}
+
 
 class SourceRunner:
-    def __init__(self, source):
+    def __init__(self, source, limiter=None, scheduler=None, cache=None, state=None, resume=None, executor=None,
+                 spool=None, drainer=None, fetcher=None):
         self.source = source
-        self.state_file = f"last_scrap_state.json"
         self.source_key = self.source.name
-        self.seen_ids = set()
+        # IDs déjà vus et date de dernière exécution (SQLite, partagé par les runners)
+        self.state = state or get_state_store()
+        # Checkpoints : IDs exportés flushés toutes les N offres ou T secondes
+        self.checkpoint_every = int(os.getenv("CRAWL_CHECKPOINT_EVERY", "10"))
+        self.checkpoint_seconds = float(os.getenv("CRAWL_CHECKPOINT_SECONDS", "30"))
+        # Reprise depuis la dernière page de listing enregistrée (CRAWL_RESUME=1)
+        if resume is None:
+            resume = os.getenv("CRAWL_RESUME", "0") == "1"
+        self.resume = resume
+        self._pending_ids = []
+        self._last_checkpoint = time.monotonic()
+        # Schémas d'extraction compilés une fois par source
+        self.schemas = get_compiled_schemas(source)
+        self.limiter = limiter
+        # Parsing et annotation : en ligne, ou dans un pool de processus (CRAWL_PROCESS_POOL=1)
+        self.executor = executor or get_cpu_executor()
+        # Politesse par hôte partagée par tout le processus
+        self.scheduler = scheduler or get_scheduler()
+        # Cache HTTP sur disque (désactivable avec CRAWL_HTTP_CACHE=0)
+        if cache is None and os.getenv("CRAWL_HTTP_CACHE", "1") == "1":
+            cache = ResponseCache()
+        self.cache = cache
+        # Retries, backoff et disjoncteur par hôte (créé au crawl, une fois le limiteur connu)
+        self.fetcher = fetcher
+        self.enricher = None
+        self._enricher_ready = False
+        # Spool d'export durable (CRAWL_EXPORT_SPOOL=0 : upserts directs vers Supabase).
+        # Sans drainer partagé (run_crawl), le runner draine lui-même pendant le crawl.
+        if spool is None and os.getenv("CRAWL_EXPORT_SPOOL", "1") == "1":
+            spool = get_export_spool()
+        self.spool = spool
+        self.drainer = drainer
+        # Découverte des offres : listing (défaut), sitemap, ou auto (sitemap si la source en déclare)
+        self.discovery = os.getenv("CRAWL_DISCOVERY", "listing").strip().lower()
+        # Préchargement de la page de listing suivante (CRAWL_PREFETCH_LISTINGS=1)
+        self.prefetch_listings = os.getenv("CRAWL_PREFETCH_LISTINGS", "0") == "1"
+        self.prefetch_stats = {"used": 0, "discarded": 0}
+        # Taille des files entre étapes du pipeline (backpressure)
+        self.queue_size = int(os.getenv("CRAWL_QUEUE_SIZE", "32"))
+        # Frontière des détails : plus large que les autres files pour que la priorité ait du choix
+        self.frontier_size = int(os.getenv("CRAWL_FRONTIER_SIZE", "1000"))
+        # URLs reportées et rendement des sources conservés dans SQLite (CRAWL_FRONTIER_PERSIST=0 : en mémoire)
+        self.frontier_persist = os.getenv("CRAWL_FRONTIER_PERSIST", "1") == "1"
+        self.frontier = None
+        self.source_yield = None
+        self._session = None
+        self.writer = None
+        self._in_flight = set()
+        # Dernière sauvegarde de curseur en attente (enchaînées dans l'ordre des pages)
+        self._cursor_task = None
         self._load_state()
 
     def _load_state(self):
         try:
-            with open(self.state_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            src_state = data.get(self.source_key, {})
-            self.seen_ids = set(src_state.get("seen_ids", []))
-            from datetime import datetime as _dt
-            last_run_str = src_state.get("last_run_utc")
-            try:
-                self.last_run_time = _dt.fromisoformat(last_run_str) if last_run_str else None
-            except Exception:
-                self.last_run_time = None
-        except Exception:
-            self.seen_ids = set()
+            self.last_run_time = self.state.get_last_run(self.source_key)
+        except Exception as e:
+            print(f"[ERROR] Failed to load state: {e}")
+            self.last_run_time = None
+
+    def _is_seen(self, uid):
+        return self.state.contains(self.source_key, uid)
+
+    def _mark_seen(self, uid):
+        """Ajoute un ID exporté au prochain checkpoint, flushé par lots."""
+        self._pending_ids.append(uid)
+        if (len(self._pending_ids) >= self.checkpoint_every
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds):
+            self._checkpoint()
+
+    def _checkpoint(self):
+        """Écrit les IDs en attente : un crash n'oublie que les offres depuis le dernier flush."""
+        self._last_checkpoint = time.monotonic()
+        if not self._pending_ids:
+            return
+        try:
+            self.state.add_many(self.source_key, self._pending_ids)
+            self._pending_ids = []
+        except Exception as e:
+            print(f"[ERROR] Checkpoint impossible pour {self.source_key}: {e}")
 
     def _save_state(self, new_ids):
         try:
-            try:
-                with open(self.state_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except Exception:
-                data = {}
-            data.setdefault(self.source_key, {})
-            data[self.source_key]["seen_ids"] = list(self.seen_ids.union(new_ids))
-            data[self.source_key]["last_run_utc"] = datetime.utcnow().isoformat()
-            with open(self.state_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._checkpoint()
+            self.state.add_many(self.source_key, new_ids)
+            self.state.set_last_run(self.source_key, datetime.utcnow())
+            # Les IDs plus vieux que la fenêtre de crawl ne peuvent plus être réexportés
+            max_age_days = int(os.getenv("MAX_JOB_AGE_DAYS", "7"))
+            evicted = self.state.evict_older_than(self.source_key, max_age_days)
+            if evicted:
+                print(f"[STATE] {evicted} IDs expirés supprimés pour {self.source_key}")
         except Exception as e:
             print(f"[ERROR] Failed to save state: {e}")
 
+    async def _fetch(self, session, url, priority=0.0):
+        # Retries classés et disjoncteur : lève FetchError une fois les tentatives épuisées
+        return await self.fetcher.fetch_text(session, url, priority)
+
+    def _priority(self, kind, position=0, depth=0, when=None):
+        """Score frontière d'une URL de la source (`when` : date brute du listing, date ou datetime)."""
+        if isinstance(when, str):
+            when = self.source.normalize_date(when) or when
+        return score(kind, position=position, depth=depth, age=age_in_days(when), source_yield=self.source_yield)
+
+    def _on_deferred(self, job):
+        # Budget épuisé : l'offre n'est pas récupérée ce run et ne compte pas pour la pagination
+        OFFERS.inc(source=self.source_key, outcome="deferred")
+        if not job.decided:
+            job.page.resolve(None)
+            job.decided = True
+        job.settle()
+
+    async def _restore_deferred(self, pipeline):
+        """Remet en file les offres reportées par le budget du run précédent."""
+        if not self.frontier_persist:
+            return
+        max_age_days = int(os.getenv("MAX_JOB_AGE_DAYS", "7"))
+        page = PageTracker()
+        for url, kind, priority, payload in self.state.take_deferred(self.source_key, max_age_days):
+            uid = payload.get("uid")
+            revisit = kind == "recheck"
+            if not uid or uid in self._in_flight or (not revisit and self._is_seen(uid)):
+                continue
+            self._in_flight.add(uid)
+            page.add()
+            self.frontier.stats["restored"] += 1
+            await pipeline.put(OfferJob(uid, payload.get("offer") or {}, url, page, revisit=revisit, priority=priority))
+
+    def _extract_listing(self, html, page_url):
+        soup = make_soup(html)
+        listing = self.schemas.listing
+        offers = [listing.extract(card) for card in listing.select_items(soup)]
+        for offer in offers:
+            # Liens relatifs (ex. href="/offre-emploi-togo/...") résolus sur la page de listing
+            if offer.get("url"):
+                offer["url"] = urljoin(page_url, offer["url"])
+        return offers
+
+    def _start_url(self, start_url):
+        """Première page à crawler : le curseur enregistré en mode reprise, sinon `start_url`."""
+        if self.resume:
+            cursor = self.state.get_cursor(self.source_key, start_url)
+            if cursor:
+                print(f"[RESUME] {self.source_key}: reprise à {cursor}")
+                return cursor
+        return start_url
+
+    def _save_cursor(self, start_url, next_url):
+        # Curseur de pagination : page à reprendre en cas d'interruption
+        if next_url:
+            self.state.save_cursor(self.source_key, start_url, next_url)
+        else:
+            self.state.clear_cursor(self.source_key, start_url)
+
+    def _save_cursor_after(self, page, start_url, next_url):
+        """
+        Enregistre le curseur une fois les offres de `page` et des pages précédentes
+        sorties du pipeline : une interruption pendant leur enrichissement ou leur
+        export fait reprendre sur cette page au lieu de les perdre (CRAWL_RESUME=1).
+        """
+        previous = self._cursor_task
+
+        async def save():
+            if previous is not None:
+                await previous
+            if page is not None:
+                await page.drained()
+            self._save_cursor(start_url, next_url)
+
+        self._cursor_task = asyncio.create_task(save())
+
+    async def _crawl_api(self, session, pipeline):
+        """
+        Pagination d'une JsonApiSource : chaque réponse donne des offres complètes,
+        envoyées directement à l'étape d'annotation. Retourne le nombre de pages lues.
+        """
+        import json
+        import logging
+
+        pages = 0
+        for start_url in self.source.get_api_urls():
+            next_url = self._start_url(start_url)
+            depth = 0
+            while next_url:
+                if self.frontier.exhausted:
+                    self._save_cursor_after(None, start_url, next_url)
+                    break
+                pages += 1
+                self.frontier.charge()
+                try:
+                    payload = json.loads(await self._fetch(session, next_url, self._priority("listing", depth=depth)))
+                except Exception as e:
+                    # Tentatives épuisées : la page reste le curseur de reprise
+                    logging.error(f"[NETWORK] Impossible de récupérer {next_url}: {e}")
+                    self._save_cursor_after(None, start_url, next_url)
+                    break
+                results = await self.executor.map_api_page(self.source, payload, self.cutoff_date)
+                page = PageTracker()
+                found_new = False
+                page_has_recent = False
+                for offer, recent in results:
+                    uid = self.source.get_item_unique_id(offer)
+                    if not uid or uid in self._new_ids or uid in self._in_flight or self._is_seen(uid):
+                        continue
+                    found_new = True
+                    if not recent:
+                        continue
+                    page_has_recent = True
+                    print(f"[NEW] {uid}")
+                    self._in_flight.add(uid)
+                    page.hold()
+                    job = OfferJob(uid, offer, offer.get("url"), page)
+                    job.decided = True
+                    await pipeline.put_at("annotate", job)
+                # Même règle d'arrêt que les listings HTML
+                if found_new and page_has_recent:
+                    next_url = self.source.get_next_api_url(payload, next_url)
+                    depth += 1
+                else:
+                    next_url = None
+                self._save_cursor_after(page, start_url, next_url)
+        return pages
+
+    def _use_sitemaps(self):
+        """Découverte par sitemap sur option : CRAWL_DISCOVERY=sitemap ou auto (si la source en déclare)."""
+        if self.discovery == "listing":
+            return False
+        if self.source.get_sitemap_urls():
+            return True
+        if self.discovery == "sitemap":
+            print(f"[WARN] {self.source_key} ne déclare pas de sitemap, découverte par listing")
+        return False
+
+    async def _discover_from_sitemaps(self, session, pipeline):
+        """
+        Envoie au pipeline les URLs du sitemap modifiées depuis la date de coupure :
+        offres jamais vues, et offres déjà exportées dont le <lastmod> est postérieur
+        au dernier run (articles modifiés).
+        """
+        since = datetime.combine(self.cutoff_date, datetime.min.time(), tzinfo=timezone.utc)
+        last_run = self.last_run_time.replace(tzinfo=timezone.utc) if self.last_run_time else None
+        reader = SitemapReader(
+            self.fetcher,
+            session,
+            accept_sitemap=self.source.accept_sitemap,
+            accept_entry=self.source.accept_sitemap_entry,
+        )
+        # Pas de pagination à décider : personne n'attend ce suivi
+        page = PageTracker()
+        async for entry in reader.discover(self.source.get_sitemap_urls(), since):
+            offer = self.source.offer_from_sitemap(entry.loc, entry.lastmod)
+            uid = self.source.get_item_unique_id(offer)
+            if not uid or uid in self._new_ids or uid in self._in_flight:
+                continue
+            revisit = self._is_seen(uid)
+            if revisit and not (entry.lastmod and last_run and entry.lastmod > last_run):
+                continue
+            print(f"[{'UPDATED' if revisit else 'NEW'}] {uid}")
+            self._in_flight.add(uid)
+            page.add()
+            # Les <lastmod> les plus récents passent en tête de la frontière
+            priority = self._priority("recheck" if revisit else "detail", when=entry.lastmod)
+            await pipeline.put(OfferJob(uid, offer, offer.get("url") or entry.loc, page, revisit=revisit, priority=priority))
+        print(f"[SITEMAP] {self.source_key}: {reader.stats}")
+
+    # --- Étapes du pipeline : chacune reçoit un OfferJob et le retourne (None = écarté) ---
+
+    async def _stage_fetch(self, job):
+        job.html = await self._fetch(self._session, job.detail_url, job.priority)
+        return job
+
+    async def _stage_parse(self, job):
+        # Parsing et extraction hors de la boucle si le pool de processus est activé
+        html, job.html = job.html, None
+        job.offer, recent = await self.executor.process_detail(
+            self.source, html, job.offer, job.detail_url, self.cutoff_date
+        )
+        job.page.resolve(recent)
+        job.decided = True
+        if not recent and not job.revisit:
+            job.settle()
+            return None  # ignore export et ne marque pas comme nouvelle
+        return job
+
+    async def _stage_annotate(self, job):
+        job.offer = await self.executor.annotate_offer(job.offer)
+        return job
+
+    async def _stage_enrich(self, job):
+        # --- Enrichissement LLM (optionnel) ---
+        if self.enricher:
+            # Appel bloquant exécuté dans un thread pour ne pas figer les autres étapes
+            with LLM_SECONDS.time(source=self.source_key):
+                job.offer = await asyncio.to_thread(self.enricher.enrich, job.offer)
+        return job
+
+    async def _stage_export(self, job):
+        from crawler.supabase_export import map_job_offer_to_items_cache
+
+        job.offer["source"] = self.source_key
+        job.offer["scrape_timestamp"] = datetime.utcnow().isoformat()
+        if self.spool is not None:
+            # --- Spool local : l'offre est acquise, le drainer la poussera vers Supabase ---
+            with EXPORT_SECONDS.time(sink="spool"):
+                self.spool.put(map_job_offer_to_items_cache(job.offer), self.source_key)
+            EXPORT_ROWS.inc(sink="spool", outcome="ok")
+            self._on_exported(job.uid, True)
+            job.settle()
+        else:
+            # --- Export Supabase (upserts groupés, résultat rapporté par offre) ---
+            await self.writer.add_async(job.offer, on_result=lambda ok, job=job: self._on_written(job, ok))
+        return None
+
+    def _on_written(self, job, ok):
+        self._on_exported(job.uid, ok)
+        job.settle()
+
+    def _on_exported(self, uid, ok):
+        if ok:
+            self._new_ids.add(uid)
+            self._mark_seen(uid)
+            self._exported += 1
+            OFFERS.inc(source=self.source_key, outcome="exported")
+        else:
+            self._errors += 1
+            OFFERS.inc(source=self.source_key, outcome="error")
+
+    def _on_stage_error(self, job, stage_name, error):
+        import logging
+
+        logging.error(f"[ERROR] Étape {stage_name} pour {job.uid}: {error!r}")
+        self._errors += 1
+        OFFERS.inc(source=self.source_key, outcome="error")
+        if not job.decided:
+            # Date inconnue : l'offre ne compte pas comme récente pour la pagination
+            job.page.resolve(None)
+            job.decided = True
+        job.settle()
+
+    def _build_pipeline(self):
+        stages = []
+        for name, handler in (
+            ("fetch", self._stage_fetch),
+            ("parse", self._stage_parse),
+            ("annotate", self._stage_annotate),
+            ("enrich", self._stage_enrich),
+            ("export", self._stage_export),
+        ):
+            workers = int(os.getenv(f"CRAWL_{name.upper()}_WORKERS", STAGE_WORKERS[name]))
+            # Les workers fetch tirent l'URL la plus prioritaire de la frontière
+            queue = self.frontier if name == "fetch" else None
+            stages.append(Stage(name, handler, workers=workers, queue_size=self.queue_size, queue=queue))
+        return Pipeline(stages, on_error=self._on_stage_error, name=self.source_key)
+
     async def crawl(self):
-        from bs4 import BeautifulSoup
-        import aiohttp
+        from crawler.supabase_export import BulkItemsCacheWriter
 
         print(f"[INFO] Crawling source: {self.source_key}")
+        started = time.monotonic()
+        # Point de départ du résumé de métriques de ce crawl
+        metrics_baseline = get_metrics().snapshot()
+        # Date du dernier run relue à chaque crawl (runner réutilisé par le daemon)
+        self._load_state()
         import logging
         # Réduire le bruit des messages "Error while closing connector"
         logging.getLogger("aiohttp.client").setLevel(logging.CRITICAL)
-        from crawler.supabase_export import upsert_job_to_supabase
-        from crawler.utils.html_cleaner import clean_html_content
-        from crawler.utils.job_classifier import JobClassifier
-        from crawler.utils.geo_extractor import GeoExtractor
         from datetime import datetime
-        try:
-            from crawler.llm_enrichment import GeminiEnricher
-            GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-            # Désactiver l'enrichissement LLM pour les clés de test
-            if GEMINI_API_KEY and GEMINI_API_KEY not in ["DEMO_MODE_PLACEHOLDER", "your_gemini_api_key_here"]:
-                enricher = GeminiEnricher(api_key=GEMINI_API_KEY)
-                print(f"[LLM] Enrichissement activé avec Gemini")
-            else:
-                enricher = None
-                if GEMINI_API_KEY in ["DEMO_MODE_PLACEHOLDER", "your_gemini_api_key_here"]:
-                    print(f"[LLM] Enrichissement désactivé - clé API de test détectée")
+        # Daemon : le runner est réutilisé d'un crawl à l'autre, l'enrichisseur est créé une fois
+        if not self._enricher_ready:
+            try:
+                from crawler.llm_enrichment import GeminiEnricher
+                GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+                # Désactiver l'enrichissement LLM pour les clés de test
+                if GEMINI_API_KEY and GEMINI_API_KEY not in ["DEMO_MODE_PLACEHOLDER", "your_gemini_api_key_here"]:
+                    enricher = GeminiEnricher(api_key=GEMINI_API_KEY)
+                    print(f"[LLM] Enrichissement activé avec Gemini")
                 else:
-                    print(f"[LLM] Enrichissement désactivé - pas de GEMINI_API_KEY")
-        except Exception as e:
-            enricher = None
-            print(f"[LLM] Erreur initialisation enrichissement : {e}")
+                    enricher = None
+                    if GEMINI_API_KEY in ["DEMO_MODE_PLACEHOLDER", "your_gemini_api_key_here"]:
+                        print(f"[LLM] Enrichissement désactivé - clé API de test détectée")
+                    else:
+                        print(f"[LLM] Enrichissement désactivé - pas de GEMINI_API_KEY")
+            except Exception as e:
+                enricher = None
+                print(f"[LLM] Erreur initialisation enrichissement : {e}")
+            self.enricher = enricher
+            self._enricher_ready = True
 
         from datetime import timedelta
         max_age_days = int(os.getenv("MAX_JOB_AGE_DAYS", "7"))  # défaut 7 jours
         oldest_allowed_by_env = datetime.utcnow().date() - timedelta(days=max_age_days)
         # Si on a une exécution précédente, on prend la date la plus récente entre cutoff env et last_run
         if getattr(self, "last_run_time", None):
-            cutoff_date = max(oldest_allowed_by_env, self.last_run_time.date())
+            self.cutoff_date = max(oldest_allowed_by_env, self.last_run_time.date())
         else:
-            cutoff_date = oldest_allowed_by_env
+            self.cutoff_date = oldest_allowed_by_env
 
-        new_ids = set()
-        exported = 0
-        errors = 0
+        self._new_ids = set()
+        self._exported = 0
+        self._errors = 0
         pages = 0
-        
-        # Initialiser le classificateur
-        classifier = JobClassifier()
-        
-        # Initialiser l'extracteur géographique
-        geo_extractor = GeoExtractor()
-        session_timeout = aiohttp.ClientTimeout(total=60)
-        async with aiohttp.ClientSession(timeout=session_timeout) as session:
-            for start_url in self.source.get_listing_urls():
-                next_url = start_url
-                while next_url:
-                    pages += 1
-                    try:
-                        async with session.get(next_url) as resp:
-                            html = await resp.text()
-                    except Exception as e:
-                        logging.error(f"[NETWORK] Impossible de récupérer {next_url}: {e}")
-                        break
-                    schema = self.source.get_listing_schema()
-                    soup = BeautifulSoup(html, "html.parser")
-                    offers = []
-                    for offer in soup.select(schema["baseSelector"]):
-                        item = {}
-                        # Champs de base (ex: url)
-                        for field in schema.get("baseFields", []):
-                            selector = field.get("selector")
-                            if selector in (None, "", ":scope", ":self"):
-                                sel = offer  # élément courant
-                            else:
-                                sel = offer.select_one(selector)
-                            if not sel:
-                                item[field["name"]] = None
-                                continue
-                            if field["type"] == "attribute":
-                                item[field["name"]] = sel.get(field["attribute"])
-                            else:
-                                item[field["name"]] = sel.get_text(strip=True)
-                        # Champs supplémentaires
-                        for field in schema.get("fields", []):
-                            selector = field.get("selector")
-                            if selector in (None, "", ":scope", ":self"):
-                                sel = offer
-                            else:
-                                sel = offer.select_one(selector)
-                            if not sel:
-                                item[field["name"]] = None
-                                continue
-                            if field["type"] == "attribute":
-                                item[field["name"]] = sel.get(field["attribute"])
-                            elif field["type"] == "html":
-                                item[field["name"]] = str(sel)
-                            else:
-                                item[field["name"]] = sel.get_text(strip=True)
-                        offers.append(item)
-                    # Filtrage incrémental : on continue si au moins une offre nouvelle
-                    found_new = False
-                    page_has_recent = False
-                    for offer in offers:
-                        uid = self.source.get_item_unique_id(offer)
-                        if not uid:
-                            continue
-                        if uid in self.seen_ids or uid in new_ids:
-                            continue
-                        found_new = True
-                        print(f"[NEW] {uid}")
-                        # --- Extraction détail ---
-                        detail_url = offer.get("url")
-                        if not detail_url:
-                            logging.warning(f"[WARN] Pas d'URL détail pour {uid}")
-                            continue
+
+        # Sans limiteur partagé (run_crawl), chaque runner a ses propres limites
+        if self.limiter is None:
+            self.limiter = ConcurrencyLimiter()
+        if self.fetcher is None:
+            self.fetcher = Fetcher(self.limiter, self.scheduler, self.cache)
+        # Frontière et budget de requêtes propres à chaque run
+        store = self.state if self.frontier_persist else None
+        self.source_yield = get_source_yield(self.source_key, store)
+        self.frontier = Frontier(self.source_key, maxsize=self.frontier_size, budget=source_budget(self.source_key),
+                                 store=store, on_defer=self._on_deferred)
+        pipeline = self._build_pipeline()
+        own_drainer = drainer_task = None
+        if self.spool is not None and self.drainer is None:
+            own_drainer = SpoolDrainer(self.spool)
+            stop_draining = asyncio.Event()
+            drainer_task = asyncio.create_task(own_drainer.run(stop_draining))
+        writer = BulkItemsCacheWriter() if self.spool is None else nullcontext()
+        prefetch = None  # (url, tâche) de la page de listing préchargée
+        try:
+            # Session et pool de connexions partagés par tous les runners du processus
+            async with http_session() as session, writer as writer:
+                self._session = session
+                self.writer = writer
+                pipeline.start()
+                await self._restore_deferred(pipeline)
+                if isinstance(self.source, JsonApiSource):
+                    # Listing et contenu complet en une requête JSON, sans page de détail
+                    pages += await self._crawl_api(session, pipeline)
+                    listing_urls = []
+                elif self._use_sitemaps():
+                    # Quelques petits XML au lieu de N pages de listing HTML
+                    await self._discover_from_sitemaps(session, pipeline)
+                    listing_urls = []
+                else:
+                    listing_urls = self.source.get_listing_urls()
+                for start_url in listing_urls:
+                    next_url = self._start_url(start_url)
+                    depth = 0
+                    while next_url:
+                        if self.frontier.exhausted:
+                            # Budget épuisé : la pagination reprendra ici (CRAWL_RESUME=1)
+                            self._save_cursor_after(None, start_url, next_url)
+                            break
+                        pages += 1
+                        self.frontier.charge()
                         try:
-                            async with session.get(detail_url) as detail_resp:
-                                detail_html = await detail_resp.text()
-                            detail_schema = self.source.get_detail_schema()
-                            detail_soup = BeautifulSoup(detail_html, "html.parser")
-                            for field in detail_schema.get("fields", []):
-                                # Champ spécial copié depuis la liste
-                                if field.get("type") == "url-from-listing":
-                                    offer[field["name"]] = detail_url
-                                    continue
-                                selector = field.get("selector")
-                                if selector in (None, "", ":scope", ":self"):
-                                    sel = detail_soup  # élément racine
-                                else:
-                                    sel = detail_soup.select_one(selector)
-                                if not sel:
-                                    offer[field["name"]] = None
-                                    continue
-                                if field["type"] == "attribute":
-                                    offer[field["name"]] = sel.get(field["attribute"])
-                                elif field["type"] == "html":
-                                    raw_html = str(sel)
-                                    # Nettoyer le HTML pour les champs de description
-                                    if field["name"] in ["job_description", "profile_required", "description"]:
-                                        offer[field["name"]] = clean_html_content(raw_html)
-                                    else:
-                                        offer[field["name"]] = raw_html
-                                elif field["type"] == "text-list":
-                                    offer[field["name"]] = [s.get_text(strip=True) for s in detail_soup.select(selector)]
-                                elif field["type"] == "keyword":
-                                    text = sel.get_text(separator=" ", strip=True).lower()
-                                    keywords = [kw.lower() for kw in field.get("keywords", [])]
-                                    offer[field["name"]] = any(kw in text for kw in keywords)
-                                elif field["type"] == "key-value-list":
-                                    items_dict = {}
-                                    for kv in detail_soup.select(selector):
-                                        label_el = kv.select_one(field.get("label_selector", "strong"))
-                                        value_el = kv.select_one(field.get("value_selector", "span"))
-                                        if label_el and value_el:
-                                            items_dict[label_el.get_text(strip=True)] = value_el.get_text(strip=True)
-                                    offer[field["name"]] = items_dict
-                                else:
-                                    offer[field["name"]] = sel.get_text(strip=True)
-                            # Normalisation spécifique plugin
-                            if hasattr(self.source, "normalize_date"):
-                                date_field = detail_schema.get("dateField")
-                                if date_field and offer.get(date_field):
-                                    offer[date_field] = self.source.normalize_date(offer[date_field])
-                            # Filtre temporel : on ignore les offres trop anciennes
-                            recent_enough = True
-                            date_field = detail_schema.get("dateField")
-                            if date_field and offer.get(date_field):
-                                val = offer.get(date_field)
-                                if isinstance(val, str):
-                                    try:
-                                        dt_parsed = datetime.fromisoformat(val)
-                                        if dt_parsed.date() <= cutoff_date:
-                                            recent_enough = False
-                                    except Exception:
-                                        pass
-                            if not recent_enough:
-                                continue  # ignore export et ne marque pas comme nouvelle
-                            page_has_recent = True
-                            # --- Classification automatique ---
-                            offer_category = classifier.classify_offer(
-                                offer.get('title', ''),
-                                offer.get('job_description', ''),
-                                offer.get('company_name', '')
-                            )
-                            offer['offer_category'] = offer_category
-                            
-                            # --- Extraction géographique ---
-                            geo_text = f"{offer.get('title', '')} {offer.get('job_description', '')} {offer.get('location', '')}"
-                            geo_info = geo_extractor.extract_location_info(geo_text)
-                            
-                            # Ajouter les informations géographiques aux données de l'offre
-                            if geo_info.get('city'):
-                                offer['detected_city'] = geo_info['city']
-                                offer['detected_region'] = geo_info['region']
-                                offer['detected_latitude'] = geo_info['latitude']
-                                offer['detected_longitude'] = geo_info['longitude']
-                            
-                            if geo_info.get('is_remote'):
-                                offer['remote_work_detected'] = True
-                            
-                            # --- Enrichissement LLM (optionnel) ---
-                            if enricher:
-                                offer = enricher.enrich(offer)
-                            # --- Export Supabase ---
-                            offer["source"] = self.source_key
-                            offer["scrape_timestamp"] = datetime.utcnow().isoformat()
-                            ok = upsert_job_to_supabase(offer)
-                            if ok:
-                                new_ids.add(uid)
-                                exported += 1
+                            if prefetch and prefetch[0] == next_url:
+                                html = await prefetch[1]
+                                self.prefetch_stats["used"] += 1
                             else:
-                                errors += 1
+                                html = await self._fetch(session, next_url, self._priority("listing", depth=depth))
                         except Exception as e:
-                            logging.exception(f"[ERROR] Extraction/Export {uid} raised an exception:")
-                            errors += 1
-                    # Pagination : on continue si (1) au moins une nouvelle offre et (2) la page contenait une offre récente
-                    if found_new and page_has_recent:
-                        next_url = self.source.get_next_page_url(html, next_url)
-                    else:
-                        next_url = None
-        self._save_state(new_ids)
-        print(f"[INFO] {len(new_ids)} nouvelles offres collectées pour {self.source_key} | Exportées: {exported} | Erreurs: {errors} | Pages parcourues: {pages}")
\ No newline at end of file
+                            # Tentatives épuisées : la page reste le curseur de reprise
+                            logging.error(f"[NETWORK] Impossible de récupérer {next_url}: {e}")
+                            self._save_cursor_after(None, start_url, next_url)
+                            break
+                        finally:
+                            prefetch = None
+                        offers = self._extract_listing(html, next_url)
+                        # Filtrage incrémental : on continue si au moins une offre nouvelle
+                        found_new = False
+                        page = PageTracker()
+                        queued = set()
+                        date_field = self.schemas.detail.date_field
+                        for position, offer in enumerate(offers):
+                            uid = self.source.get_item_unique_id(offer)
+                            if not uid:
+                                continue
+                            if uid in self._new_ids or uid in queued or uid in self._in_flight or self._is_seen(uid):
+                                continue
+                            found_new = True
+                            print(f"[NEW] {uid}")
+                            # --- Extraction détail ---
+                            detail_url = offer.get("url")
+                            if not detail_url:
+                                logging.warning(f"[WARN] Pas d'URL détail pour {uid}")
+                                continue
+                            queued.add(uid)
+                            page.add()
+                            # Priorité : date affichée sur le listing, rang dans la page, profondeur
+                            priority = self._priority("detail", position, depth, offer.get(date_field) if date_field else None)
+                            # Attend si la frontière est pleine (backpressure)
+                            await pipeline.put(OfferJob(uid, offer, detail_url, page, priority=priority))
+                        self._in_flight |= queued
+                        # Préchargement spéculatif : la page suivante est demandée pendant
+                        # le traitement des détails, et jetée si la pagination s'arrête
+                        if self.prefetch_listings and found_new:
+                            speculative_url = self.source.get_next_page_url(html, next_url)
+                            if speculative_url:
+                                task = asyncio.create_task(
+                                    self._fetch(session, speculative_url, self._priority("listing", depth=depth + 1))
+                                )
+                                # Une page jetée en erreur ne doit pas lever d'avertissement
+                                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                                prefetch = (speculative_url, task)
+                        # Seule la date des offres est attendue ici : l'enrichissement et
+                        # l'export de la page continuent pendant le fetch de la suivante
+                        page_has_recent = await page.wait()
+                        # Pagination : on continue si (1) au moins une nouvelle offre et (2) la page contenait une offre récente
+                        if found_new and page_has_recent:
+                            next_url = prefetch[0] if prefetch else self.source.get_next_page_url(html, next_url)
+                            depth += 1
+                        else:
+                            next_url = None
+                        if prefetch and prefetch[0] != next_url:
+                            prefetch[1].cancel()
+                            prefetch = None
+                            self.prefetch_stats["discarded"] += 1
+                        # Curseur avancé seulement quand les offres de la page ont quitté le pipeline
+                        self._save_cursor_after(page, start_url, next_url)
+                await pipeline.join()
+            # Writer fermé : les derniers résultats d'export sont connus, les curseurs suivent
+            if self._cursor_task is not None:
+                await self._cursor_task
+        finally:
+            if self._cursor_task is not None and not self._cursor_task.done():
+                # Interruption : les offres non sorties du pipeline gardent leur page comme curseur
+                self._cursor_task.cancel()
+            self._cursor_task = None
+            if prefetch:
+                prefetch[1].cancel()
+            await pipeline.close()
+            self._session = None
+            self.writer = None
+            self._in_flight = set()
+            # Crash ou annulation : les IDs déjà exportés ne seront pas réexportés
+            self._checkpoint()
+            if drainer_task is not None:
+                stop_draining.set()
+                await drainer_task
+        if own_drainer is not None:
+            await own_drainer.finish()
+        self._save_state(self._new_ids)
+        deferred = self.frontier.save()
+        source_yield = record_source_yield(self.source_key, len(self._new_ids), self.frontier.spent, store)
+        print(f"[INFO] {len(self._new_ids)} nouvelles offres collectées pour {self.source_key} | Exportées: {self._exported} | Erreurs: {self._errors} | Pages parcourues: {pages}")
+        for name, stats in pipeline.stats().items():
+            print(f"[PIPELINE] {self.source_key}/{name}: {stats}")
+        if writer is not None:
+            print(f"[EXPORT] {self.source_key}: {writer.stats}")
+        if self.prefetch_listings:
+            print(f"[PREFETCH] {self.source_key}: {self.prefetch_stats}")
+        print(f"[FETCH] {self.source_key}: {self.fetcher.summary()}")
+        print(f"[FRONTIER] {self.source_key}: {self.frontier.summary()} | rendement {source_yield or 0:.2f} nouvelles offres/requête"
+              + (f" | {deferred} URLs reportées au prochain run" if deferred else ""))
+        if self.cache:
+            print(f"[CACHE] {self.source_key}: {self.cache.stats} (hit rate {self.cache.hit_rate():.0%})")
+        stats = {
+            "new": len(self._new_ids),
+            "exported": self._exported,
+            "errors": self._errors,
+            "pages": pages,
+            "requests": self.frontier.spent,
+            "deferred": deferred,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        RUN_SECONDS.observe(stats["seconds"], source=self.source_key)
+        self._report_metrics(metrics_baseline, stats)
+        return stats
+
+    def _report_metrics(self, baseline, stats):
+        """
+        Résumé JSON des métriques du crawl (séries de cette source et de ses hôtes, plus les
+        séries communes au processus), ajouté à CRAWL_METRICS_JSON ; exposition Prometheus
+        réécrite dans CRAWL_METRICS_FILE.
+        """
+        registry = get_metrics()
+
+        def match(labels):
+            if labels.get("source", self.source_key) != self.source_key:
+                return False
+            if labels.get("pipeline", self.source_key) != self.source_key:
+                return False
+            return "host" not in labels or labels["host"] in self.fetcher.hosts
+
+        summary = registry.summary(baseline, match)
+        stages = {row["labels"]["stage"]: row["p95"] for row in summary.get("crawl_stage_seconds", [])}
+        hosts = {row["labels"]["host"]: row["p95"] for row in summary.get("crawl_fetch_seconds", [])}
+        print(f"[METRICS] {self.source_key}: p95 par étape {stages} | p95 fetch par hôte {hosts}")
+        try:
+            registry.append_json({
+                "source": self.source_key,
+                "finished_at": datetime.utcnow().isoformat(),
+                "stats": stats,
+                "metrics": summary,
+            })
+            registry.write_file()
+        except OSError as e:
+            print(f"[METRICS] Écriture des métriques impossible: {e}")
@@ -0,0 +1,268 @@
+"""
+Exécution des traitements CPU (parsing, extraction, annotation) hors de la boucle asyncio.
+
+Le parsing BeautifulSoup, la classification et l'extraction géographique sont
+purement CPU : exécutés dans la boucle, ils bloquent toutes les requêtes en vol.
+✅ fonctions de traitement au niveau module : même code en ligne ou dans un worker
+✅ CpuExecutor opt-in (CRAWL_PROCESS_POOL=1) : ProcessPoolExecutor de workers chauds
+✅ classificateur, extracteurs et schémas compilés initialisés une fois par worker
+✅ seuls le HTML brut (bytes) et les dicts d'offres traversent la frontière de processus
+✅ temps de parsing, d'extraction, de classification et de géolocalisation mesurés,
+   y compris dans les workers (mesures renvoyées avec le résultat)
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler.core.metrics import CLASSIFIER_SECONDS, EXTRACT_SECONDS, GEO_SECONDS, PARSE_SECONDS, get_metrics
+from crawler.core.schema_compiler import get_compiled_schemas
+from crawler.utils.document import DocumentContext
+
+# Objets coûteux propres au processus courant (worker ou processus principal)
+_tools: Dict[str, Any] = {}
+_sources: Dict[type, Any] = {}
+
+
+def _get_tools() -> Dict[str, Any]:
+    if not _tools:
+        from crawler.utils.job_classifier import JobClassifier
+        from crawler.utils.geo_extractor import GeoExtractor
+        from crawler.utils.intelligent_extractor import IntelligentExtractor
+
+        _tools["classifier"] = JobClassifier()
+        _tools["geo_extractor"] = GeoExtractor()
+        _tools["intelligent_extractor"] = IntelligentExtractor()
+    return _tools
+
+
+def _get_source(source_cls):
+    source = _sources.get(source_cls)
+    if source is None:
+        source = _sources[source_cls] = source_cls()
+    return source
+
+
+def _init_worker(source_classes=()) -> None:
+    """Initialiseur du pool : outils et schémas prêts avant la première page."""
+    # Mesures héritées du processus principal (fork) : déjà comptées là-bas
+    get_metrics().drain()
+    _get_tools()
+    for source_cls in source_classes:
+        get_compiled_schemas(_get_source(source_cls))
+
+
+def _decode(html) -> str:
+    if isinstance(html, bytes):
+        return html.decode("utf-8", errors="replace")
+    return html or ""
+
+
+def _is_recent(offer: Dict[str, Any], date_field: Optional[str], cutoff_date) -> bool:
+    """Filtre temporel : False si l'offre est antérieure à la date de coupure."""
+    if date_field and offer.get(date_field):
+        val = offer.get(date_field)
+        if isinstance(val, str):
+            try:
+                dt_parsed = datetime.fromisoformat(val)
+                if dt_parsed.date() <= cutoff_date:
+                    return False
+            except Exception:
+                pass
+    return True
+
+
+def process_detail(source_cls, html, offer: Dict[str, Any], detail_url: str, cutoff_date) -> Tuple[Dict[str, Any], bool]:
+    """
+    Parse une page de détail et complète `offer` avec le schéma compilé de la source.
+    Retourne (offer, recent).
+    """
+    source = _get_source(source_cls)
+    detail = get_compiled_schemas(source).detail
+    with PARSE_SECONDS.time(source=source.name):
+        soup = DocumentContext(_decode(html)).soup
+    with EXTRACT_SECONDS.time(source=source.name):
+        detail.extract(soup, offer, url=detail_url)
+        # Normalisation spécifique plugin
+        if hasattr(source, "normalize_date"):
+            date_field = detail.date_field
+            if date_field and offer.get(date_field):
+                offer[date_field] = source.normalize_date(offer[date_field])
+    return offer, _is_recent(offer, detail.date_field, cutoff_date)
+
+
+def map_api_page(source_cls, payload, cutoff_date) -> List[Tuple[Dict[str, Any], bool]]:
+    """Offres d'une réponse JSON (JsonApiSource), avec date normalisée : liste de (offer, recent)."""
+    source = _get_source(source_cls)
+    results = []
+    for offer in source.parse_api_page(payload):
+        date_field = source.date_field
+        if date_field and offer.get(date_field):
+            offer[date_field] = source.normalize_date(offer[date_field])
+        results.append((offer, _is_recent(offer, date_field, cutoff_date)))
+    return results
+
+
+def annotate_offer(offer: Dict[str, Any]) -> Dict[str, Any]:
+    """Classification et extraction géographique, sur les textes normalisés des champs."""
+    tools = _get_tools()
+    document = DocumentContext()
+    title = offer.get('title', '')
+    description = offer.get('job_description', '')
+    # --- Classification automatique ---
+    with CLASSIFIER_SECONDS.time():
+        offer['offer_category'] = tools["classifier"].classify_offer(
+            title,
+            description,
+            offer.get('company_name', ''),
+            normalized_text=f"{document.normalized(title)} {document.normalized(description)} "
+                            f"{document.normalized(offer.get('company_name', ''))}"
+        )
+
+    # --- Extraction géographique ---
+    geo_text = f"{title} {description} {offer.get('location', '')}"
+    with GEO_SECONDS.time():
+        geo_info = tools["geo_extractor"].extract_location_info(
+            geo_text,
+            normalized_text=f"{document.normalized(title)} {document.normalized(description)} "
+                            f"{document.normalized(offer.get('location', ''))}"
+        )
+
+    # Ajouter les informations géographiques aux données de l'offre
+    if geo_info.get('city'):
+        offer['detected_city'] = geo_info['city']
+        offer['detected_region'] = geo_info['region']
+        offer['detected_latitude'] = geo_info['latitude']
+        offer['detected_longitude'] = geo_info['longitude']
+
+    if geo_info.get('is_remote'):
+        offer['remote_work_detected'] = True
+    return offer
+
+
+def enhance_unified_item(html, item: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Améliorations Phase 2 du crawler unifié : extraction intelligente, classification,
+    géolocalisation et nettoyage HTML. Retourne (item, intelligent_data, geo_result).
+    """
+    from crawler.utils.html_cleaner import clean_html_content
+
+    tools = _get_tools()
+    html = _decode(html)
+    # Contexte partagé : la page n'est parsée qu'une fois, à la demande
+    document = DocumentContext(html or None)
+
+    # 0. Extraction intelligente des données manquantes
+    intelligent_data = {}
+    if html:
+        intelligent_data = tools["intelligent_extractor"].extract_all_data(html, item, document=document)
+        for key, value in intelligent_data.items():
+            if value and (not item.get(key) or len(str(value)) > len(str(item.get(key, '')))):
+                item[key] = value
+
+    # 1. Classification automatique
+    with CLASSIFIER_SECONDS.time():
+        item['offer_category'] = tools["classifier"].classify_offer(
+            item.get('title', ''),
+            item.get('job_description', ''),
+            item.get('company_name', ''),
+            normalized_text=f"{document.normalized(item.get('title', ''))} "
+                            f"{document.normalized(item.get('job_description', ''))} "
+                            f"{document.normalized(item.get('company_name', ''))}"
+        )
+
+    # 2. Extraction géographique
+    location_text = f"{item.get('location', '')} {item.get('job_description', '')}"
+    with GEO_SECONDS.time():
+        geo_result = tools["geo_extractor"].extract_location_info(
+            location_text,
+            normalized_text=f"{document.normalized(item.get('location', ''))} "
+                            f"{document.normalized(item.get('job_description', ''))}"
+        )
+    item['detected_city'] = geo_result['city']
+    item['detected_region'] = geo_result['region']
+    item['detected_latitude'] = geo_result['latitude']
+    item['detected_longitude'] = geo_result['longitude']
+    item['remote_work_detected'] = geo_result['is_remote']
+
+    # 3. Nettoyage HTML
+    if item.get('job_description'):
+        item['job_description'] = clean_html_content(item['job_description'])
+    return item, intelligent_data, geo_result
+
+
+def _run_measured(fn, *args):
+    """Appel dans un worker : résultat et mesures prises pendant l'appel."""
+    return fn(*args), get_metrics().drain()
+
+
+class CpuExecutor:
+    """
+    Exécute les fonctions de ce module en ligne (défaut) ou dans un pool de processus.
+
+    Activé par CRAWL_PROCESS_POOL=1 ; CRAWL_PROCESS_WORKERS fixe le nombre de
+    workers (défaut : nombre de cœurs). Le pool est créé au premier appel.
+    """
+
+    def __init__(self, enabled=None, workers=None, source_classes=()):
+        if enabled is None:
+            enabled = os.getenv("CRAWL_PROCESS_POOL", "0") == "1"
+        self.enabled = enabled
+        self.workers = workers or int(os.getenv("CRAWL_PROCESS_WORKERS", "0")) or os.cpu_count() or 1
+        self.source_classes = tuple(source_classes)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.source_classes,),
+            )
+            print(f"[EXECUTOR] Pool de {self.workers} processus démarré")
+        return self._pool
+
+    async def run(self, fn, *args):
+        """Appelle `fn(*args)` ; dans un worker si le pool est activé."""
+        if not self.enabled:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        result, measures = await loop.run_in_executor(self._get_pool(), _run_measured, fn, *args)
+        # Les métriques du worker rejoignent celles du processus principal
+        get_metrics().merge(measures)
+        return result
+
+    async def process_detail(self, source, html, offer, detail_url, cutoff_date):
+        if self.enabled and isinstance(html, str):
+            # Bytes UTF-8 : sérialisation plus compacte que la chaîne Python
+            html = html.encode("utf-8")
+        return await self.run(process_detail, type(source), html, offer, detail_url, cutoff_date)
+
+    async def map_api_page(self, source, payload, cutoff_date):
+        return await self.run(map_api_page, type(source), payload, cutoff_date)
+
+    async def annotate_offer(self, offer):
+        return await self.run(annotate_offer, offer)
+
+    async def enhance_unified_item(self, html, item):
+        if self.enabled and isinstance(html, str):
+            html = html.encode("utf-8")
+        return await self.run(enhance_unified_item, html, item)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+_executor: Optional[CpuExecutor] = None
+
+
+def get_cpu_executor() -> CpuExecutor:
+    """Retourne le CpuExecutor unique du processus (pool partagé par tous les runners)."""
+    global _executor
+    if _executor is None:
+        _executor = CpuExecutor()
+    return _executor
@@ -0,0 +1,197 @@
+"""
+Spool d'export durable entre le crawl et Supabase (write-behind).
+
+Le crawl n'attend plus la base : chaque offre mappée vers items_cache est écrite
+dans une file SQLite locale, puis un drainer la pousse vers Supabase.
+✅ écriture locale à la vitesse du disque, offre marquée vue dès qu'elle est spoolée
+✅ une ligne par item_id : une nouvelle version remplace celle encore en attente
+✅ drainer par lots (BulkItemsCacheWriter) avec upsert idempotent sur item_id
+✅ backoff exponentiel par ligne ; mise de côté (dead) après CRAWL_SPOOL_MAX_ATTEMPTS échecs
+✅ une panne Supabase ne coûte plus de re-crawl : les lignes attendent dans le spool
+
+Vidage manuel : python -m crawler.core.export_spool
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from crawler.core.metrics import SPOOL_DEPTH
+
+
+class ExportSpool:
+    """File d'export persistante (SQLite, mode WAL)."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CRAWL_SPOOL_DB", "export_spool.sqlite3")
+        # Connexion partagée entre la boucle (put) et le thread du drainer
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool (item_id TEXT PRIMARY KEY, source TEXT, row TEXT NOT NULL, "
+            "enqueued_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt REAL NOT NULL DEFAULT 0, last_error TEXT, dead INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS spool_due ON spool (dead, next_attempt)")
+        self._lock = threading.Lock()
+
+    def put(self, row: Dict[str, Any], source: Optional[str] = None) -> None:
+        """Ajoute (ou remplace) la ligne items_cache `row` ; elle sera poussée au prochain drain."""
+        self.put_many([row], source)
+
+    def put_many(self, rows: Iterable[Dict[str, Any]], source: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            # REPLACE donne un nouveau rowid : un ack d'une ancienne version ne supprime pas la nouvelle
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO spool (item_id, source, row, enqueued_at) VALUES (?, ?, ?, ?)",
+                ((row["item_id"], source, json.dumps(row, ensure_ascii=False, default=str), now) for row in rows),
+            )
+
+    def claim(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lignes dues, les plus anciennes d'abord : liste de (rowid, row)."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT rowid, row FROM spool WHERE dead = 0 AND next_attempt <= ? ORDER BY rowid LIMIT ?",
+                (time.time(), limit),
+            )
+            return [(rowid, json.loads(row)) for rowid, row in cursor.fetchall()]
+
+    def ack(self, rowids: Iterable[int]) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM spool WHERE rowid = ?", ((rowid,) for rowid in rowids))
+
+    def nack(self, rowids: Iterable[int], error: str, base_delay: float, max_delay: float, max_attempts: int) -> int:
+        """Replanifie les lignes en échec ; retourne le nombre de lignes mises de côté (dead)."""
+        now = time.time()
+        dead = 0
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            for rowid in rowids:
+                row = self.conn.execute("SELECT attempts FROM spool WHERE rowid = ?", (rowid,)).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                is_dead = attempts >= max_attempts
+                dead += is_dead
+                delay = min(max_delay, base_delay * 2 ** (attempts - 1))
+                self.conn.execute(
+                    "UPDATE spool SET attempts = ?, next_attempt = ?, last_error = ?, dead = ? WHERE rowid = ?",
+                    (attempts, now + delay, error, int(is_dead), rowid),
+                )
+        return dead
+
+    def depth(self) -> Dict[str, int]:
+        with self._lock:
+            pending, dead = self.conn.execute(
+                "SELECT COALESCE(SUM(dead = 0), 0), COALESCE(SUM(dead = 1), 0) FROM spool"
+            ).fetchone()
+        SPOOL_DEPTH.set(pending, state="pending")
+        SPOOL_DEPTH.set(dead, state="dead")
+        return {"pending": pending, "dead": dead}
+
+    def revive_dead(self) -> int:
+        """Remet en file les lignes mises de côté (après correction d'un problème de schéma par ex.)."""
+        with self._lock:
+            cursor = self.conn.execute("UPDATE spool SET dead = 0, attempts = 0, next_attempt = 0 WHERE dead = 1")
+            return cursor.rowcount
+
+
+class SpoolDrainer:
+    """
+    Pousse le contenu du spool vers items_cache par lots, avec retries.
+    Configurable via CRAWL_SPOOL_BATCH, CRAWL_SPOOL_INTERVAL, CRAWL_SPOOL_RETRY_BASE,
+    CRAWL_SPOOL_RETRY_MAX et CRAWL_SPOOL_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, spool: Optional[ExportSpool] = None, client=None, batch_size=None, interval=None):
+        self.spool = spool or get_export_spool()
+        self.client = client
+        self.batch_size = batch_size or int(os.getenv("CRAWL_SPOOL_BATCH", "200"))
+        self.interval = interval or float(os.getenv("CRAWL_SPOOL_INTERVAL", "5"))
+        self.retry_base = float(os.getenv("CRAWL_SPOOL_RETRY_BASE", "5"))
+        self.retry_max = float(os.getenv("CRAWL_SPOOL_RETRY_MAX", "900"))
+        self.max_attempts = int(os.getenv("CRAWL_SPOOL_MAX_ATTEMPTS", "10"))
+        self.stats = {"pushed": 0, "failed": 0, "dead": 0}
+
+    def drain_once(self) -> int:
+        """Pousse un lot de lignes dues ; retourne le nombre de lignes traitées (succès ou échec)."""
+        from crawler.supabase_export import BulkItemsCacheWriter
+
+        batch = self.spool.claim(self.batch_size)
+        if not batch:
+            return 0
+        results: Dict[int, bool] = {}
+        writer = BulkItemsCacheWriter(batch_size=self.batch_size, client=self.client, on_conflict="item_id")
+        with writer:
+            for rowid, row in batch:
+                writer.add_row(row, on_result=lambda ok, rowid=rowid: results.__setitem__(rowid, ok))
+        pushed = [rowid for rowid, ok in results.items() if ok]
+        failed = [rowid for rowid, ok in results.items() if not ok]
+        self.spool.ack(pushed)
+        if failed:
+            self.stats["dead"] += self.spool.nack(
+                failed, "upsert items_cache refusé", self.retry_base, self.retry_max, self.max_attempts
+            )
+            print(f"[SPOOL] {len(failed)} lignes en échec, nouvel essai différé")
+        self.stats["pushed"] += len(pushed)
+        self.stats["failed"] += len(failed)
+        self.spool.depth()  # jauge du spool mise à jour après chaque lot
+        return len(batch)
+
+    def drain(self, max_seconds: Optional[float] = None) -> int:
+        """Vide les lignes dues (bloquant) ; s'arrête au premier lot vide ou après `max_seconds`."""
+        started = time.monotonic()
+        total = 0
+        while max_seconds is None or time.monotonic() - started < max_seconds:
+            processed = self.drain_once()
+            if not processed:
+                break
+            total += processed
+        return total
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Boucle de fond : draine toutes les `interval` secondes jusqu'à `stop`."""
+        while not stop.is_set():
+            try:
+                processed = await asyncio.to_thread(self.drain_once)
+            except Exception as e:
+                print(f"[SPOOL] Erreur drain: {e}")
+                processed = 0
+            if not processed:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def finish(self, max_seconds: Optional[float] = None) -> None:
+        """Drain final en fin de run ; ce qui reste sera poussé au prochain lancement."""
+        if max_seconds is None:
+            max_seconds = float(os.getenv("CRAWL_SPOOL_FINAL_DRAIN_SECONDS", "60"))
+        await asyncio.to_thread(self.drain, max_seconds)
+        print(f"[SPOOL] {self.stats} | en attente: {self.spool.depth()}")
+
+
+_spool: Optional[ExportSpool] = None
+
+
+def get_export_spool() -> ExportSpool:
+    """Retourne le spool unique du processus."""
+    global _spool
+    if _spool is None:
+        _spool = ExportSpool()
+    return _spool
+
+
+if __name__ == "__main__":
+    drainer = SpoolDrainer()
+    print(f"[SPOOL] En attente: {drainer.spool.depth()}")
+    drainer.drain()
+    print(f"[SPOOL] {drainer.stats} | en attente: {drainer.spool.depth()}")
@@ -0,0 +1,262 @@
+"""
+Couche de récupération HTTP du moteur : retries classés, backoff et disjoncteur par hôte.
+
+Une erreur réseau passagère ne doit plus coûter une pagination entière :
+✅ retries classés : timeouts / erreurs de connexion, 429 (avec Retry-After), 5xx
+✅ backoff exponentiel avec jitter (CRAWL_RETRY_ATTEMPTS, CRAWL_RETRY_BASE, CRAWL_RETRY_MAX)
+✅ disjoncteur par hôte : après CRAWL_BREAKER_THRESHOLD échecs consécutifs, l'hôte est
+   mis en pause CRAWL_BREAKER_COOLDOWN secondes, puis une seule requête test le rouvre
+✅ compteurs par tentative, par motif de retry et par déclenchement du disjoncteur
+✅ politesse (limiteur + scheduler) et cache conditionnel appliqués à chaque tentative
+✅ métriques par hôte : latence et statut de chaque tentative, octets reçus, retries
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from crawler.core.metrics import FETCH_REQUESTS, FETCH_RETRIES, FETCH_SECONDS, RESPONSE_BYTES
+
+# Statuts réessayés (501 Not Implemented ne changera pas)
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524}
+
+
+class FetchError(Exception):
+    """Échec définitif d'une récupération (après retries, ou erreur non réessayable)."""
+
+    def __init__(self, url: str, reason: str, status: Optional[int] = None):
+        super().__init__(f"{reason} ({status}) pour {url}" if status else f"{reason} pour {url}")
+        self.url = url
+        self.reason = reason
+        self.status = status
+
+
+class CircuitOpenError(FetchError):
+    """Hôte en pause trop longtemps : la requête est abandonnée sans être envoyée."""
+
+
+class _Circuit:
+    __slots__ = ("failures", "state", "open_until", "probe", "trips")
+
+    def __init__(self):
+        self.failures = 0
+        self.state = "closed"
+        self.open_until = 0.0
+        self.probe: Optional[asyncio.Event] = None
+        self.trips = 0
+
+
+class CircuitBreaker:
+    """Disjoncteur par hôte, partagé par tous les runners du processus."""
+
+    def __init__(self, threshold=None, cooldown=None, max_wait=None):
+        self.threshold = threshold or int(os.getenv("CRAWL_BREAKER_THRESHOLD", "5"))
+        self.cooldown = cooldown or float(os.getenv("CRAWL_BREAKER_COOLDOWN", "60"))
+        # Au-delà, une requête vers un hôte en pause est abandonnée plutôt qu'attendue
+        self.max_wait = max_wait or float(os.getenv("CRAWL_BREAKER_MAX_WAIT", "300"))
+        self._circuits: Dict[str, _Circuit] = {}
+
+    def _circuit(self, host: str) -> _Circuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit()
+        return circuit
+
+    async def before(self, url: str) -> None:
+        """Attend que l'hôte soit disponible ; en demi-ouverture, une seule requête test passe."""
+        host = urlparse(url).netloc
+        circuit = self._circuit(host)
+        while True:
+            if circuit.state == "open":
+                remaining = circuit.open_until - time.monotonic()
+                if remaining > self.max_wait:
+                    raise CircuitOpenError(url, "circuit ouvert")
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                circuit.state = "half_open"
+                circuit.probe = None
+            if circuit.state == "half_open":
+                if circuit.probe is None:
+                    # Cette requête sert de test ; les autres attendent son résultat
+                    circuit.probe = asyncio.Event()
+                    return
+                probe = circuit.probe
+                try:
+                    await asyncio.wait_for(probe.wait(), self.cooldown)
+                except asyncio.TimeoutError:
+                    # Requête test annulée sans résultat : une autre prend le relais
+                    if circuit.probe is probe:
+                        circuit.probe = None
+                continue
+            return
+
+    def record_success(self, url: str) -> None:
+        circuit = self._circuit(urlparse(url).netloc)
+        circuit.failures = 0
+        if circuit.state != "closed":
+            print(f"[BREAKER] {urlparse(url).netloc} refermé")
+        self._settle(circuit, "closed")
+
+    def record_failure(self, url: str) -> None:
+        host = urlparse(url).netloc
+        circuit = self._circuit(host)
+        circuit.failures += 1
+        if circuit.state == "half_open" or circuit.failures >= self.threshold:
+            if circuit.state != "open":
+                circuit.trips += 1
+                print(f"[BREAKER] {host} en pause {self.cooldown:.0f}s après {circuit.failures} échecs")
+            circuit.open_until = time.monotonic() + self.cooldown
+            self._settle(circuit, "open")
+
+    @staticmethod
+    def _settle(circuit: _Circuit, state: str) -> None:
+        circuit.state = state
+        if circuit.probe is not None:
+            circuit.probe.set()
+            circuit.probe = None
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {
+            host: {"state": c.state, "consecutive_failures": c.failures, "trips": c.trips}
+            for host, c in self._circuits.items()
+        }
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """En-tête Retry-After : secondes ou date HTTP."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Fetcher:
+    """Récupère des pages avec politesse, cache conditionnel, retries et disjoncteur."""
+
+    def __init__(self, limiter, scheduler, cache=None, breaker=None,
+                 max_attempts=None, backoff_base=None, backoff_max=None):
+        self.limiter = limiter
+        self.scheduler = scheduler
+        self.cache = cache
+        self.breaker = breaker or get_circuit_breaker()
+        self.max_attempts = max_attempts or int(os.getenv("CRAWL_RETRY_ATTEMPTS", "4"))
+        self.backoff_base = backoff_base or float(os.getenv("CRAWL_RETRY_BASE", "1"))
+        self.backoff_max = backoff_max or float(os.getenv("CRAWL_RETRY_MAX", "60"))
+        self.stats = {"requests": 0, "attempts": 0, "retries": 0, "failures": 0, "retry_wait_seconds": 0.0}
+        self.retry_reasons: Counter = Counter()
+        # Hôtes contactés : filtre des métriques par hôte dans le résumé du run
+        self.hosts = set()
+
+    @asynccontextmanager
+    async def polite(self, session, url, priority: float = 0.0):
+        """Slot de concurrence (servi par priorité) puis délai de politesse de l'hôte, autour d'une requête."""
+        async with self.limiter.slot(url, priority):
+            await self.scheduler.acquire(url, session)
+            yield
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        # Jitter "complet" : les clients en échec ne se resynchronisent pas
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    async def fetch_text(self, session, url: str, priority: float = 0.0) -> str:
+        """Corps de la page (depuis le cache si le serveur répond 304)."""
+        return await self._get(session, url, priority, binary=False)
+
+    async def fetch_bytes(self, session, url: str, priority: float = 0.0) -> bytes:
+        """Corps brut, non décodé (ex. sitemap .xml.gz) ; pas de cache conditionnel."""
+        return await self._get(session, url, priority, binary=True)
+
+    async def _get(self, session, url: str, priority: float, binary: bool):
+        self.stats["requests"] += 1
+        host = urlparse(url).netloc
+        self.hosts.add(host)
+        for attempt in range(1, self.max_attempts + 1):
+            await self.breaker.before(url)
+            self.stats["attempts"] += 1
+            retry_after = None
+            try:
+                headers = self.cache.conditional_headers(url) if self.cache and not binary else {}
+                async with self.polite(session, url, priority):
+                    # Latence mesurée une fois le slot obtenu : attente de politesse exclue
+                    with FETCH_SECONDS.time(host=host):
+                        async with session.get(url, headers=headers) as resp:
+                            FETCH_REQUESTS.inc(host=host, status=resp.status)
+                            if resp.status == 304 and headers:
+                                cached = self.cache.read_body(url)
+                                self.breaker.record_success(url)
+                                if cached is not None:
+                                    return cached
+                                # Corps absent du disque : l'entrée est oubliée et la page
+                                # redemandée sans en-têtes conditionnels
+                                self.cache.forget(url)
+                                reason = "cache_evicted"
+                            elif resp.status in RETRYABLE_STATUSES:
+                                reason = f"http_{resp.status}"
+                                retry_after = _retry_after(resp.headers.get("Retry-After"))
+                            elif resp.status >= 400:
+                                # L'hôte répond : erreur propre à la page, pas de retry
+                                self.breaker.record_success(url)
+                                self.stats["failures"] += 1
+                                raise FetchError(url, "http", resp.status)
+                            else:
+                                body = await resp.read()
+                                RESPONSE_BYTES.observe(len(body), host=host)
+                                if binary:
+                                    self.breaker.record_success(url)
+                                    return body
+                                html = body.decode(resp.get_encoding())
+                                if self.cache and resp.status == 200:
+                                    self.cache.store(url, html, resp.headers)
+                                self.breaker.record_success(url)
+                                return html
+            except asyncio.TimeoutError:
+                reason = "timeout"
+                FETCH_REQUESTS.inc(host=host, status=reason)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+                reason = "connection"
+                FETCH_REQUESTS.inc(host=host, status=reason)
+            if reason != "cache_evicted":
+                self.breaker.record_failure(url)
+            self.retry_reasons[reason] += 1
+            if attempt == self.max_attempts:
+                self.stats["failures"] += 1
+                raise FetchError(url, f"{reason} après {attempt} tentatives")
+            # Cache évincé : l'hôte a répondu, nouvelle tentative sans attendre
+            delay = 0.0 if reason == "cache_evicted" else self._backoff(attempt, retry_after)
+            self.stats["retries"] += 1
+            FETCH_RETRIES.inc(host=host, reason=reason)
+            self.stats["retry_wait_seconds"] += delay
+            await asyncio.sleep(delay)
+
+    def summary(self) -> Dict[str, object]:
+        return {**self.stats, "retry_wait_seconds": round(self.stats["retry_wait_seconds"], 2),
+                "retry_reasons": dict(self.retry_reasons)}
+
+
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Retourne le disjoncteur unique du processus (état partagé par hôte)."""
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker()
+    return _breaker
@@ -0,0 +1,206 @@
+"""
+Frontière de crawl : les URLs à récupérer, servies par valeur décroissante.
+
+Les URLs étaient traitées dans l'ordre de découverte : une page 9 de listing
+périmée passait avant une offre toute fraîche de la page 1, et aucune source
+n'avait la priorité sur une autre.
+✅ file de priorité d'une source, interchangeable avec la file d'une Stage du pipeline
+✅ score par URL : type (détail, listing, re-vérification), date du listing ou <lastmod>,
+   position dans la page, profondeur de pagination, rendement de la source
+✅ budget de requêtes par source et par run : au-delà, les URLs sont reportées
+✅ persistance SQLite optionnelle des URLs reportées (reprises au run suivant)
+   et du rendement de chaque source (moyenne mobile des nouvelles offres par requête)
+✅ entre sources : les slots globaux du ConcurrencyLimiter servent la plus haute priorité d'abord
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import re
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+# Poids par type d'URL : une offre inconnue avant une page de listing, une re-vérification en dernier
+KIND_WEIGHTS = {"detail": 1.0, "listing": 0.8, "recheck": 0.5}
+# Demi-vie de la fraîcheur : une offre de FRESHNESS_DAYS jours vaut moitié moins qu'une offre du jour
+FRESHNESS_DAYS = 3.0
+# Décote par rang dans la page de listing et par page de pagination
+POSITION_DECAY = 0.03
+DEPTH_DECAY = 0.85
+# Poids du dernier run dans la moyenne mobile du rendement
+YIELD_ALPHA = 0.3
+
+
+def age_in_days(value) -> Optional[float]:
+    """Âge d'une date (ISO, date ou datetime) en jours ; None si elle est inconnue ou illisible."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return max(0.0, (datetime.now(timezone.utc) - value).total_seconds() / 86400)
+    if isinstance(value, date):
+        return float(max(0, (datetime.now(timezone.utc).date() - value).days))
+    return None
+
+
+def score(kind: str, position: int = 0, depth: int = 0, age: Optional[float] = None,
+          source_yield: Optional[float] = None) -> float:
+    """Valeur attendue d'une URL : plus elle est haute, plus tôt l'URL est récupérée."""
+    value = KIND_WEIGHTS.get(kind, 0.5)
+    value /= 1 + POSITION_DECAY * position
+    value *= DEPTH_DECAY ** depth
+    if age is not None:
+        value *= 0.5 ** (age / FRESHNESS_DAYS)
+    if source_yield is not None:
+        # Rendement inconnu = neutre ; une source qui ne publie plus rien pèse moitié moins
+        value *= 0.5 + min(1.0, source_yield)
+    return value
+
+
+_yields: Dict[str, float] = {}
+
+
+def get_source_yield(source: str, store=None) -> Optional[float]:
+    """Nouvelles offres par requête de la source (moyenne mobile), None avant le premier run."""
+    if source not in _yields and store is not None:
+        value = store.get_source_yield(source)
+        if value is not None:
+            _yields[source] = value
+    return _yields.get(source)
+
+
+def record_source_yield(source: str, new: int, requests: int, store=None) -> Optional[float]:
+    """Met à jour le rendement d'une source après un run ; retourne la nouvelle valeur."""
+    if requests <= 0:
+        return get_source_yield(source, store)
+    observed = new / requests
+    previous = get_source_yield(source, store)
+    value = observed if previous is None else YIELD_ALPHA * observed + (1 - YIELD_ALPHA) * previous
+    _yields[source] = value
+    if store is not None:
+        store.set_source_yield(source, value)
+    return value
+
+
+def source_budget(source: str) -> int:
+    """Budget de requêtes d'une source par run : CRAWL_FRONTIER_BUDGET_<SOURCE>, sinon CRAWL_FRONTIER_BUDGET (0 = illimité)."""
+    specific = os.getenv("CRAWL_FRONTIER_BUDGET_" + re.sub(r"\W", "_", source).upper())
+    return int(specific or os.getenv("CRAWL_FRONTIER_BUDGET", "0"))
+
+
+class Frontier(asyncio.PriorityQueue):
+    """
+    File de priorité des URLs d'une source, utilisable comme file d'une Stage.
+
+    Les éléments exposent `priority` (plus haut = plus tôt ; ordre d'arrivée à égalité)
+    et `frontier_entry()` -> (url, kind, priority, payload). Une fois `budget` requêtes
+    servies (détails retirés de la file, listings imputés avec `charge`), chaque élément
+    retiré est reporté : `on_defer(item)` est appelé et l'entrée est gardée pour `save()`.
+    """
+
+    def __init__(self, source: str, maxsize: int = 0, budget: int = 0, store=None,
+                 on_defer: Optional[Callable[[Any], None]] = None):
+        self._seq = itertools.count()
+        super().__init__(maxsize)
+        self.source = source
+        self.budget = budget
+        self.store = store
+        self.on_defer = on_defer
+        self.spent = 0
+        self._deferred = []
+        self.stats = {"pushed": 0, "served": 0, "deferred": 0, "restored": 0, "max_depth": 0}
+        self.pushed_by_kind: Counter = Counter()
+
+    # Crochets d'asyncio.Queue : le tas contient (-priorité, rang d'arrivée, élément)
+    def _put(self, item) -> None:
+        super()._put((-item.priority, next(self._seq), item))
+        self.stats["pushed"] += 1
+        self.pushed_by_kind[getattr(item, "kind", "detail")] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self.qsize())
+
+    def _get(self):
+        return super()._get()[2]
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.budget) and self.spent >= self.budget
+
+    def charge(self, requests: int = 1) -> None:
+        """Impute au budget une requête faite hors de la file (page de listing, réponse JSON)."""
+        self.spent += requests
+
+    async def get(self):
+        while True:
+            item = await super().get()
+            if not self.exhausted:
+                self.spent += 1
+                self.stats["served"] += 1
+                return item
+            self._defer(item)
+
+    def _defer(self, item) -> None:
+        self.stats["deferred"] += 1
+        self._deferred.append(item.frontier_entry())
+        try:
+            if self.on_defer:
+                self.on_defer(item)
+        finally:
+            self.task_done()
+
+    def save(self) -> int:
+        """Écrit les URLs reportées (si la persistance est active) ; retourne leur nombre."""
+        deferred, self._deferred = self._deferred, []
+        if deferred and self.store is not None:
+            try:
+                self.store.defer_urls(self.source, deferred)
+            except Exception as e:
+                print(f"[FRONTIER] URLs reportées non enregistrées pour {self.source}: {e}")
+        return len(deferred)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "budget": self.budget or None,
+            "requests": self.spent,
+            "pushed_by_kind": dict(self.pushed_by_kind),
+        }
+
+
+class PrioritySemaphore:
+    """Sémaphore dont les tâches en attente sont servies par priorité décroissante (FIFO à égalité)."""
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: float = 0.0) -> None:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Slot transmis juste avant l'annulation : on le rend
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        # Le slot passe directement à la tâche la plus prioritaire encore en attente
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[2]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
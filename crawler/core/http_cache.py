@@ -0,0 +1,121 @@
+"""
+Cache HTTP local avec revalidation ETag / Last-Modified.
+
+Organisation sur disque (CRAWL_HTTP_CACHE_DIR, défaut `.http_cache`) :
+- `index/<sha256(url)>.json` : validateurs et empreinte du corps pour une URL
+- `bodies/<sha256(corps)>`    : corps des réponses, adressés par leur contenu
+  (deux URLs renvoyant le même HTML partagent le même fichier)
+
+Les requêtes suivantes envoient `If-None-Match` / `If-Modified-Since` ; une
+réponse 304 est servie depuis le disque sans retélécharger la page.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from crawler.core.metrics import HTTP_CACHE
+
+
+class ResponseCache:
+    """Cache de réponses indexé par URL, corps adressés par contenu."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.getenv("CRAWL_HTTP_CACHE_DIR", ".http_cache")
+        self.index_dir = os.path.join(self.cache_dir, "index")
+        self.bodies_dir = os.path.join(self.cache_dir, "bodies")
+        os.makedirs(self.index_dir, exist_ok=True)
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.index_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.bodies_dir, digest)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Retourne l'entrée d'index de `url` si son corps est présent sur disque."""
+        try:
+            with open(self._index_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except Exception:
+            return None
+        if not os.path.exists(self._body_path(entry.get("body_sha256", ""))):
+            return None
+        return entry
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """En-têtes de requête conditionnelle pour `url` (vide si rien en cache)."""
+        entry = self.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def read_body(self, url: str) -> Optional[str]:
+        """Corps en cache pour `url`, compté comme un hit (réponse 304)."""
+        entry = self.get(url)
+        if not entry:
+            return None
+        try:
+            with open(self._body_path(entry["body_sha256"]), "rb") as f:
+                body = f.read().decode("utf-8")
+        except FileNotFoundError:
+            return None
+        self.stats["hits"] += 1
+        HTTP_CACHE.inc(result="hit")
+        return body
+
+    def store(self, url: str, body: str, headers: Mapping[str, str]) -> bool:
+        """
+        Enregistre une réponse 200. Sans validateur (ETag/Last-Modified) la
+        réponse ne pourrait pas être revalidée : elle n'est pas conservée.
+        """
+        self.stats["misses"] += 1
+        HTTP_CACHE.inc(result="miss")
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not etag and not last_modified:
+            return False
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        body_path = self._body_path(digest)
+        if not os.path.exists(body_path):
+            tmp_path = f"{body_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, body_path)
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_sha256": digest,
+            "stored_at": time.time(),
+        }
+        index_path = self._index_path(url)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, index_path)
+        self.stats["stores"] += 1
+        return True
+
+    def forget(self, url: str) -> None:
+        """Supprime l'entrée d'index de `url` : la prochaine requête sera inconditionnelle."""
+        try:
+            os.remove(self._index_path(url))
+        except FileNotFoundError:
+            pass
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
@@ -0,0 +1,167 @@
+"""
+Client HTTP partagé par tout le processus (crawlers aiohttp et ingestion requests).
+
+Une session par runner, c'était un pool de connexions, une résolution DNS et une
+poignée de main TLS par source et par exécution. Ici :
+✅ une seule session aiohttp par processus, partagée par les runners et le crawler unifié
+✅ pool explicite : CRAWL_HTTP_POOL_SIZE connexions, CRAWL_HTTP_PER_HOST par hôte, keep-alive
+✅ cache DNS (CRAWL_HTTP_DNS_TTL) et négociation gzip/deflate (+ brotli si installé)
+✅ timeouts explicites : connexion (CRAWL_HTTP_CONNECT_TIMEOUT), lecture (CRAWL_HTTP_READ_TIMEOUT)
+✅ statistiques d'utilisation du pool : connexions créées / réutilisées, en cours, cache DNS
+✅ une requests.Session partagée (pool urllib3) pour les modules synchrones (jsearch_ingestion)
+"""
+
+import importlib.util
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+
+def _accept_encoding() -> str:
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        return "gzip, deflate, br"
+    return "gzip, deflate"
+
+
+def _timeouts() -> Tuple[float, float, float]:
+    """(connexion, lecture, total) en secondes."""
+    return (
+        float(os.getenv("CRAWL_HTTP_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("CRAWL_HTTP_READ_TIMEOUT", "30")),
+        float(os.getenv("CRAWL_HTTP_TOTAL_TIMEOUT", "60")),
+    )
+
+
+class SharedHttpSession:
+    """
+    Session aiohttp unique, ouverte par le premier utilisateur et fermée par le dernier.
+
+    Les points d'entrée (run_crawl, crawler unifié) l'ouvrent pour toute la durée
+    du processus ; un SourceRunner lancé seul l'ouvre et la ferme lui-même.
+    """
+
+    def __init__(self):
+        self.pool_size = int(os.getenv("CRAWL_HTTP_POOL_SIZE", "100"))
+        self.per_host = int(os.getenv("CRAWL_HTTP_PER_HOST", "8"))
+        self.dns_ttl = int(os.getenv("CRAWL_HTTP_DNS_TTL", "300"))
+        self.keepalive = float(os.getenv("CRAWL_HTTP_KEEPALIVE", "30"))
+        self.session = None
+        self._users = 0
+        self.stats = {
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+            "max_in_use": 0,
+        }
+
+    def _trace_config(self):
+        import aiohttp
+
+        trace = aiohttp.TraceConfig()
+
+        def count(key):
+            async def handler(session, ctx, params):
+                self.stats[key] += 1
+                if key == "requests":
+                    self.stats["max_in_use"] = max(self.stats["max_in_use"], self._in_use())
+            return handler
+
+        trace.on_request_start.append(count("requests"))
+        trace.on_connection_create_end.append(count("connections_created"))
+        trace.on_connection_reuseconn.append(count("connections_reused"))
+        trace.on_dns_cache_hit.append(count("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(count("dns_cache_misses"))
+        return trace
+
+    def _open(self):
+        import aiohttp
+
+        connect, read, total = _timeouts()
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=self.dns_ttl,
+            keepalive_timeout=self.keepalive,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=total, connect=connect, sock_read=read),
+            headers={"Accept-Encoding": _accept_encoding()},
+            trace_configs=[self._trace_config()],
+        )
+
+    @asynccontextmanager
+    async def use(self):
+        """Session partagée ; fermée quand le dernier utilisateur sort."""
+        if self.session is None or self.session.closed:
+            self.session = self._open()
+        self._users += 1
+        try:
+            yield self.session
+        finally:
+            self._users -= 1
+            if self._users == 0:
+                session, self.session = self.session, None
+                print(f"[HTTP] {self.pool_stats()}")
+                await session.close()
+
+    def _in_use(self) -> int:
+        connector = self.session.connector if self.session else None
+        # Connexions actuellement prêtées à des requêtes (attribut interne d'aiohttp)
+        return len(getattr(connector, "_acquired", ())) if connector else 0
+
+    def pool_stats(self) -> Dict[str, Any]:
+        created = self.stats["connections_created"]
+        reused = self.stats["connections_reused"]
+        return {
+            **self.stats,
+            "pool_size": self.pool_size,
+            "per_host": self.per_host,
+            "in_use": self._in_use(),
+            "reuse_rate": round(reused / (created + reused), 2) if created + reused else 0.0,
+        }
+
+
+_shared: Optional[SharedHttpSession] = None
+
+
+def get_shared_http() -> SharedHttpSession:
+    """Retourne le client HTTP asynchrone unique du processus."""
+    global _shared
+    if _shared is None:
+        _shared = SharedHttpSession()
+    return _shared
+
+
+def http_session():
+    """`async with http_session() as session:` — la session aiohttp partagée."""
+    return get_shared_http().use()
+
+
+_requests_session = None
+
+
+def get_requests_session():
+    """requests.Session partagée : pool urllib3 dimensionné, keep-alive et compression."""
+    global _requests_session
+    if _requests_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        pool_size = int(os.getenv("CRAWL_HTTP_POOL_SIZE", "100"))
+        per_host = int(os.getenv("CRAWL_HTTP_PER_HOST", "8"))
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=per_host)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept-Encoding"] = _accept_encoding()
+        _requests_session = session
+    return _requests_session
+
+
+def request_timeout() -> Tuple[float, float]:
+    """Timeout (connexion, lecture) à passer aux appels requests."""
+    connect, read, _ = _timeouts()
+    return connect, read
@@ -0,0 +1,127 @@
+"""
+Stratégie de récupération hybride du crawler unifié : HTTP d'abord, navigateur si besoin.
+
+Rendre chaque page dans Playwright, même le HTML statique d'emploi.tg, coûte
+5 à 10 fois une requête HTTP. Ici, page par page :
+✅ récupération HTTP (politesse, retries, cache conditionnel du Fetcher) puis schéma compilé
+✅ escalade vers le navigateur seulement si le `baseSelector` ne trouve rien,
+   si un champ obligatoire (`"required": True`) est vide ou si la requête échoue
+✅ mode par source (`render_mode`) : auto, http ou browser ; CRAWL_RENDER_MODE force un mode
+✅ taux d'escalade et motifs comptés par source
+"""
+
+import json
+import os
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from crawler.core.fetcher import FetchError
+from crawler.core.render_profile import get_render_profile
+from crawler.core.schema_compiler import get_compiled_schemas
+from crawler.utils.parser_backend import make_soup
+
+RENDER_MODES = ("auto", "http", "browser")
+
+
+def _source_stats() -> Dict[str, Any]:
+    return {"pages": 0, "http": 0, "browser": 0, "escalations": 0, "reasons": Counter()}
+
+
+class HybridFetcher:
+    """
+    Récupère listings et détails d'une source et les passe au schéma compilé.
+
+    `browser` rend une page (`arun(url, config, profile)` : pool d'onglets) en naviguant
+    vers sa vraie URL : un document `raw:` n'a pas d'origine (scripts relatifs, XHR et
+    cookies échouent), c'est justement ce que le rendu doit fournir.
+    """
+
+    def __init__(self, fetcher, session, browser):
+        self.fetcher = fetcher
+        self.session = session
+        self.browser = browser
+        self.forced_mode = os.getenv("CRAWL_RENDER_MODE", "").strip().lower() or None
+        self.stats: Dict[str, Dict[str, Any]] = defaultdict(_source_stats)
+
+    def mode(self, source) -> str:
+        mode = self.forced_mode or getattr(source, "render_mode", "auto")
+        return mode if mode in RENDER_MODES else "auto"
+
+    async def _http(self, url: str):
+        """(HTML, soupe, None) via HTTP, ou (None, None, motif) si la requête échoue."""
+        try:
+            html = await self.fetcher.fetch_text(self.session, url)
+        except FetchError as e:
+            return None, None, f"http_{e.status}" if e.status else "http_error"
+        return html, make_soup(html), None
+
+    async def _browser(self, source, url: str, config) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        stats = self.stats[source.name]
+        stats["browser"] += 1
+        profile = get_render_profile(source)
+        result = await self.browser.arun(url, config=config, profile=profile)
+        if not result.success or not result.extracted_content:
+            return None, None
+        data = json.loads(result.extracted_content)
+        return (data if isinstance(data, list) else [data]), result.html
+
+    def _escalate(self, source, reason: str) -> None:
+        stats = self.stats[source.name]
+        stats["escalations"] += 1
+        stats["reasons"][reason] += 1
+
+    async def listing(self, source, url: str, config) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """(offres du listing, HTML) ; (None, None) si la page n'a pas pu être lue."""
+        stats = self.stats[source.name]
+        stats["pages"] += 1
+        mode = self.mode(source)
+        if mode != "browser":
+            html, soup, reason = await self._http(url)
+            if soup is not None:
+                schema = get_compiled_schemas(source).listing
+                cards = schema.select_items(soup)
+                items = [schema.extract(card) for card in cards]
+                if not cards:
+                    reason = "base_selector"
+                elif all(schema.missing_required(item) for item in items):
+                    reason = "required_fields"
+                else:
+                    stats["http"] += 1
+                    return items, html
+            if mode == "http":
+                return None, None
+            self._escalate(source, reason)
+        return await self._browser(source, url, config)
+
+    async def detail(self, source, url: str, config) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(champs de la page de détail, HTML) ; (None, None) si la page n'a pas pu être lue."""
+        stats = self.stats[source.name]
+        stats["pages"] += 1
+        mode = self.mode(source)
+        if mode != "browser":
+            html, soup, reason = await self._http(url)
+            if soup is not None:
+                schema = get_compiled_schemas(source).detail
+                scopes = schema.select_items(soup)
+                if not scopes:
+                    reason = "base_selector"
+                else:
+                    detail = schema.extract(scopes[0], url=url)
+                    if not schema.missing_required(detail):
+                        stats["http"] += 1
+                        return detail, html
+                    reason = "required_fields"
+            if mode == "http":
+                return None, None
+            self._escalate(source, reason)
+        data, html = await self._browser(source, url, config)
+        return (data[0] if data else None), html
+
+    def summary(self, source_name: str) -> Dict[str, Any]:
+        stats = self.stats[source_name]
+        pages = stats["pages"]
+        return {
+            **stats,
+            "reasons": dict(stats["reasons"]),
+            "escalation_rate": round(stats["escalations"] / pages, 2) if pages else 0.0,
+        }
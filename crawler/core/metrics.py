@@ -0,0 +1,351 @@
+"""
+Métriques du crawler : compteurs, jauges et histogrammes étiquetés.
+
+Les seules mesures d'un run étaient les `print` de fin de crawl : impossible de
+savoir quelle étape limite le débit sans attacher un profiler à la main.
+✅ compteurs, jauges et histogrammes à étiquettes (hôte, source, étape...), sans dépendance
+✅ latence et octets des réponses par hôte, parsing et extraction, classification,
+   géolocalisation, LLM, latence d'export, profondeur des files, hits du cache HTTP
+✅ format texte Prometheus : GET /metrics du daemon, ou fichier CRAWL_METRICS_FILE
+✅ résumé JSON par crawl de source (p50/p95 par série), ajouté en JSON Lines à CRAWL_METRICS_JSON
+✅ mesures prises dans les workers du pool de processus rapatriées dans le processus principal
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Durées (s) : de la milliseconde (classification) à la minute (requête lente, lot d'export)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+RUN_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 3600)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def labels_of(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def copy_series(self) -> Dict[Tuple[str, ...], Any]:
+        with self._lock:
+            return {key: self._copy(state) for key, state in self._series.items()}
+
+    @staticmethod
+    def _copy(state):
+        return state
+
+
+class Counter(_Metric):
+    """Valeur qui ne fait que croître (requêtes, octets, offres...)."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def merge(self, series: Dict[Tuple[str, ...], float]) -> None:
+        with self._lock:
+            for key, value in series.items():
+                self._series[key] = self._series.get(key, 0.0) + value
+
+    def render(self):
+        for key, value in self.copy_series().items():
+            yield f"{self.name}{self._label_text(key)} {_format(value)}"
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (profondeur d'une file, lignes en attente...)."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def merge(self, series: Dict[Tuple[str, ...], float]) -> None:
+        with self._lock:
+            self._series.update(series)
+
+    def render(self):
+        for key, value in self.copy_series().items():
+            yield f"{self.name}{self._label_text(key)} {_format(value)}"
+
+
+class Histogram(_Metric):
+    """
+    Distribution d'une mesure par seaux (bornes supérieures `buckets`).
+    État d'une série : [comptes par seau (le dernier = +Inf), somme, nombre, maximum].
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    @staticmethod
+    def _copy(state):
+        return [list(state[0]), state[1], state[2], state[3]]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._series.get(key)
+            if state is None:
+                state = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+            state[3] = max(state[3], value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée du bloc (secondes), même s'il lève une exception."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def merge(self, series: Dict[Tuple[str, ...], list]) -> None:
+        with self._lock:
+            for key, other in series.items():
+                state = self._series.get(key)
+                if state is None:
+                    self._series[key] = self._copy(other)
+                    continue
+                state[0] = [a + b for a, b in zip(state[0], other[0])]
+                state[1] += other[1]
+                state[2] += other[2]
+                state[3] = max(state[3], other[3])
+
+    def quantile(self, state, q: float) -> float:
+        """Quantile estimé par interpolation linéaire dans le seau qui le contient."""
+        counts, _, count, maximum = state
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else maximum
+                upper = min(upper, maximum)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return maximum
+
+    def render(self):
+        for key, (counts, total, count, _) in self.copy_series().items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format(bound) + '"'
+                yield f"{self.name}_bucket{self._label_text(key, le)} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(key)} {_format(total)}"
+            yield f"{self.name}_count{self._label_text(key)} {count}"
+
+
+class MetricsRegistry:
+    """Ensemble des métriques du processus : rendu Prometheus, instantanés et résumés JSON."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: Optional[str] = None) -> Optional[str]:
+        """Écrit le rendu Prometheus dans `path` (défaut CRAWL_METRICS_FILE), par remplacement atomique."""
+        path = path or os.getenv("CRAWL_METRICS_FILE")
+        if not path:
+            return None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        return path
+
+    def snapshot(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        return {name: metric.copy_series() for name, metric in self._metrics.items()}
+
+    def drain(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """Instantané puis remise à zéro : mesures d'un worker à renvoyer au processus principal."""
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            with metric._lock:
+                if metric._series:
+                    snapshot[name] = metric._series
+                    metric._series = {}
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Dict[Tuple[str, ...], Any]]) -> None:
+        for name, series in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(series)
+
+    def summary(self, baseline: Optional[Dict[str, Dict[Tuple[str, ...], Any]]] = None,
+                match: Optional[Callable[[Dict[str, str]], bool]] = None) -> Dict[str, list]:
+        """
+        Résumé JSON des séries : valeur (compteurs, jauges) ou count/sum/avg/p50/p95/max (histogrammes).
+        Avec `baseline` (instantané pris au début d'un crawl), seules les mesures prises depuis comptent.
+        `match(labels)` filtre les séries (ex. celles d'une source).
+        """
+        baseline = baseline or {}
+        result: Dict[str, list] = {}
+        for name, metric in self._metrics.items():
+            before = baseline.get(name, {})
+            rows = []
+            for key, state in metric.copy_series().items():
+                labels = metric.labels_of(key)
+                if match is not None and not match(labels):
+                    continue
+                if isinstance(metric, Histogram):
+                    previous = before.get(key)
+                    if previous is not None:
+                        state = [[a - b for a, b in zip(state[0], previous[0])],
+                                 state[1] - previous[1], state[2] - previous[2], state[3]]
+                    count = state[2]
+                    if not count:
+                        continue
+                    rows.append({
+                        "labels": labels,
+                        "count": count,
+                        "sum": round(state[1], 3),
+                        "avg": round(state[1] / count, 4),
+                        "p50": round(metric.quantile(state, 0.5), 4),
+                        "p95": round(metric.quantile(state, 0.95), 4),
+                        "max": round(state[3], 4),
+                    })
+                else:
+                    value = state - before.get(key, 0.0) if isinstance(metric, Counter) else state
+                    if value:
+                        rows.append({"labels": labels, "value": round(value, 3)})
+            if rows:
+                result[name] = rows
+        return result
+
+    def append_json(self, record: Dict[str, Any], path: Optional[str] = None) -> Optional[str]:
+        """Ajoute un résumé de run (une ligne JSON) à `path` (défaut CRAWL_METRICS_JSON)."""
+        path = path or os.getenv("CRAWL_METRICS_JSON")
+        if not path:
+            return None
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        return path
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Retourne le registre unique du processus."""
+    return _registry
+
+
+# --- Métriques du crawler ---
+
+FETCH_SECONDS = _registry.histogram(
+    "crawl_fetch_seconds", "Durée d'une tentative HTTP, corps compris", ("host",))
+FETCH_REQUESTS = _registry.counter(
+    "crawl_fetch_requests_total", "Tentatives HTTP par hôte et statut (ou timeout, connection)", ("host", "status"))
+FETCH_RETRIES = _registry.counter(
+    "crawl_fetch_retries_total", "Nouvelles tentatives par hôte et motif", ("host", "reason"))
+RESPONSE_BYTES = _registry.histogram(
+    "crawl_response_bytes", "Taille des corps de réponse reçus", ("host",), BYTES_BUCKETS)
+HTTP_CACHE = _registry.counter(
+    "crawl_http_cache_total", "Cache HTTP conditionnel : hit (304 servi du cache) ou miss (200)", ("result",))
+STAGE_SECONDS = _registry.histogram(
+    "crawl_stage_seconds", "Durée du handler d'une étape du pipeline", ("pipeline", "stage"))
+STAGE_ITEMS = _registry.counter(
+    "crawl_stage_items_total", "Éléments traités par étape : processed, dropped, error", ("pipeline", "stage", "outcome"))
+QUEUE_DEPTH = _registry.gauge(
+    "crawl_queue_depth", "Éléments en attente dans la file d'une étape", ("pipeline", "stage"))
+PARSE_SECONDS = _registry.histogram(
+    "crawl_parse_seconds", "Parsing HTML d'une page de détail", ("source",))
+EXTRACT_SECONDS = _registry.histogram(
+    "crawl_extract_seconds", "Extraction du schéma de détail et normalisation", ("source",))
+CLASSIFIER_SECONDS = _registry.histogram(
+    "crawl_classifier_seconds", "Classification d'une offre")
+GEO_SECONDS = _registry.histogram(
+    "crawl_geo_seconds", "Extraction géographique d'une offre")
+RENDER_SECONDS = _registry.histogram(
+    "crawl_render_seconds", "Rendu navigateur d'une page (crawler unifié)", ("source",))
+RENDER_BYTES = _registry.counter(
+    "crawl_render_bytes_total", "Octets des rendus : downloaded, saved (estimation des ressources bloquées)",
+    ("source", "kind"))
+LLM_SECONDS = _registry.histogram(
+    "crawl_llm_seconds", "Enrichissement LLM d'une offre", ("source",))
+EXPORT_SECONDS = _registry.histogram(
+    "crawl_export_seconds", "Envoi d'un lot vers la destination d'export", ("sink",))
+EXPORT_ROWS = _registry.counter(
+    "crawl_export_rows_total", "Lignes exportées par destination et résultat", ("sink", "outcome"))
+SPOOL_DEPTH = _registry.gauge(
+    "crawl_spool_depth", "Lignes du spool d'export : pending, dead", ("state",))
+OFFERS = _registry.counter(
+    "crawl_offers_total", "Offres par source : exported, error, deferred", ("source", "outcome"))
+RUN_SECONDS = _registry.histogram(
+    "crawl_run_seconds", "Durée d'un crawl de source", ("source",), RUN_BUCKETS)
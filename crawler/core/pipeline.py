@@ -0,0 +1,154 @@
+"""
+Pipeline asynchrone par étapes reliées par des files bornées.
+
+Chaque étape (fetch, parse, annotate, enrich, export...) a :
+✅ sa propre file `asyncio.Queue` bornée : un producteur trop rapide attend (backpressure)
+   (ou une file fournie avec la même interface, ex. la frontière de crawl)
+✅ son nombre de workers configurable
+✅ ses compteurs (éléments traités, écartés, erreurs, profondeur de file, débit),
+   aussi publiés dans les métriques du processus (étiquettes pipeline et étape)
+
+Un handler reçoit un élément et retourne l'élément à passer à l'étape suivante,
+ou None pour l'écarter. Une exception est comptée, transmise au callback
+`on_error` du pipeline, et l'élément est abandonné.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from crawler.core.metrics import QUEUE_DEPTH, STAGE_ITEMS, STAGE_SECONDS
+
+
+class Stage:
+    """Une étape du pipeline : une file bornée consommée par `workers` tâches."""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], workers: int = 1, queue_size: int = 32,
+                 queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = queue if queue is not None else asyncio.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        # Étiquette des métriques, fixée par le Pipeline
+        self.pipeline = ""
+
+    async def put(self, item) -> None:
+        # Bloque quand la file est pleine : l'étape amont ralentit d'elle-même
+        await self.queue.put(item)
+        depth = self.queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        QUEUE_DEPTH.set(depth, pipeline=self.pipeline, stage=self.name)
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "throughput_per_s": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class Pipeline:
+    """
+    Enchaîne des étapes : la sortie de l'étape i est placée dans la file de l'étape i+1.
+
+    Usage :
+        pipeline = Pipeline([Stage("fetch", fetch), Stage("parse", parse)], on_error=...)
+        pipeline.start()
+        await pipeline.put(item)   # attend si la première file est pleine
+        await pipeline.join()      # vide toutes les étapes puis arrête les workers
+    """
+
+    def __init__(self, stages: List[Stage], on_error: Optional[Callable[[Any, str, BaseException], None]] = None,
+                 name: str = "pipeline"):
+        self.stages = stages
+        self.on_error = on_error
+        self.name = name
+        for stage in stages:
+            stage.pipeline = name
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+
+    def start(self) -> None:
+        self._started_at = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for n in range(stage.workers):
+                self._tasks.append(asyncio.create_task(
+                    self._worker(stage, next_stage), name=f"{stage.name}-{n}"
+                ))
+
+    async def put(self, item) -> None:
+        await self.stages[0].put(item)
+
+    async def put_at(self, stage_name: str, item) -> None:
+        """Entre directement à l'étape `stage_name` (élément déjà récupéré et parsé)."""
+        for stage in self.stages:
+            if stage.name == stage_name:
+                await stage.put(item)
+                return
+        raise KeyError(stage_name)
+
+    async def _worker(self, stage: Stage, next_stage: Optional[Stage]) -> None:
+        while True:
+            item = await stage.queue.get()
+            labels = {"pipeline": self.name, "stage": stage.name}
+            QUEUE_DEPTH.set(stage.queue.qsize(), **labels)
+            try:
+                started = time.monotonic()
+                try:
+                    result = await stage.handler(item)
+                finally:
+                    elapsed = time.monotonic() - started
+                    stage.busy_seconds += elapsed
+                    STAGE_SECONDS.observe(elapsed, **labels)
+                stage.processed += 1
+                STAGE_ITEMS.inc(outcome="processed", **labels)
+                if next_stage is None:
+                    pass
+                elif result is None:
+                    stage.dropped += 1
+                    STAGE_ITEMS.inc(outcome="dropped", **labels)
+                else:
+                    # Placé en aval avant task_done : join() étape par étape reste exact
+                    await next_stage.put(result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stage.errors += 1
+                STAGE_ITEMS.inc(outcome="error", **labels)
+                if self.on_error:
+                    self.on_error(item, stage.name, e)
+                else:
+                    logging.exception(f"[PIPELINE] Erreur à l'étape {stage.name}:")
+            finally:
+                stage.queue.task_done()
+
+    async def join(self) -> None:
+        """Attend que chaque étape, dans l'ordre, ait vidé sa file, puis arrête les workers."""
+        try:
+            for stage in self.stages:
+                await stage.queue.join()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Arrête les workers sans attendre les éléments restants (arrêt sur erreur)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {stage.name: stage.stats(elapsed) for stage in self.stages}
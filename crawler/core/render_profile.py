@@ -0,0 +1,173 @@
+"""
+Profils de rendu navigateur par source (crawler unifié, Crawl4AI / Playwright).
+
+Un rendu complet charge images, polices, trackers et scripts publicitaires, puis
+attend `body` (déjà présent) : du temps et de la mémoire par onglet pour rien.
+✅ blocage au niveau réseau (route Playwright) par type de ressource et motif d'URL
+✅ images désactivées par défaut, trackers et régies publicitaires courants bloqués
+✅ attente du vrai sélecteur de contenu du schéma (`css:`) avec un timeout court
+✅ par page : temps de rendu ; par source : requêtes bloquées, octets téléchargés
+   et octets économisés (estimés) par les ressources bloquées
+
+Une source ajuste son profil avec `get_render_profile()` (dict de surcharges).
+"""
+
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+
+from crawler.core.metrics import RENDER_BYTES, RENDER_SECONDS
+from crawler.core.schema_compiler import SCOPE_SELECTORS
+
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font")
+DEFAULT_BLOCKED_PATTERNS = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+)
+
+
+# Taille estimée d'une ressource bloquée dont la taille n'a jamais été vue
+# (ordre de grandeur des médianes HTTP Archive par type de requête)
+BLOCKED_BYTES_ESTIMATE = {
+    "image": 30_000,
+    "media": 200_000,
+    "font": 25_000,
+    "script": 20_000,
+    "stylesheet": 10_000,
+}
+DEFAULT_BLOCKED_BYTES = 5_000
+# Tailles (content-length) déjà vues par URL, tous profils confondus
+_KNOWN_SIZES_MAX = 10_000
+_known_sizes: Dict[str, int] = {}
+
+
+def blocked_bytes(resource_type: str, url: str) -> int:
+    """Octets évités par une requête bloquée : taille déjà vue pour l'URL, sinon estimation par type."""
+    size = _known_sizes.get(url)
+    if size is not None:
+        return size
+    return BLOCKED_BYTES_ESTIMATE.get(resource_type, DEFAULT_BLOCKED_BYTES)
+
+
+class RenderProfile:
+    """Ressources bloquées et attente d'une source, avec ses compteurs de rendu."""
+
+    def __init__(self, blocked_types: Optional[Iterable[str]] = None,
+                 blocked_patterns: Optional[Iterable[str]] = None,
+                 wait_for: Optional[str] = None, wait_timeout: Optional[float] = None,
+                 source_name: str = ""):
+        self.blocked_types = frozenset(DEFAULT_BLOCKED_TYPES if blocked_types is None else blocked_types)
+        self.blocked_patterns = tuple(DEFAULT_BLOCKED_PATTERNS if blocked_patterns is None else blocked_patterns)
+        # Sélecteur d'attente imposé (sinon dérivé du schéma)
+        self.wait_for = wait_for
+        self.wait_timeout = wait_timeout or float(os.getenv("CRAWL_RENDER_WAIT_TIMEOUT", "10"))
+        self.source_name = source_name
+        self.stats = {"renders": 0, "render_seconds": 0.0, "blocked": 0, "bytes": 0, "bytes_saved": 0}
+        self.blocked_by_type: Counter = Counter()
+        # Durée du dernier rendu de chaque page
+        self.page_seconds: Dict[str, float] = {}
+
+    @classmethod
+    def from_source(cls, source) -> "RenderProfile":
+        overrides = getattr(source, "get_render_profile", lambda: {})() or {}
+        return cls(**overrides, source_name=source.name)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        return resource_type in self.blocked_types or any(p in url for p in self.blocked_patterns)
+
+    def wait_selector(self, schema: Dict[str, Any]) -> Optional[str]:
+        """Sélecteur du contenu attendu : `baseSelector` s'il est significatif, sinon les champs obligatoires."""
+        if self.wait_for:
+            return self.wait_for
+        base = schema.get("baseSelector")
+        if base not in SCOPE_SELECTORS and base != "body":
+            return base
+        fields = schema.get("baseFields", []) + schema.get("fields", [])
+        selectors = [f["selector"] for f in fields
+                     if f.get("required") and f.get("selector") not in SCOPE_SELECTORS]
+        return ", ".join(selectors) or None
+
+    def run_config_options(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Options CrawlerRunConfig : attente du contenu réel, timeout court, images exclues."""
+        options = {
+            "page_timeout": int(max(self.wait_timeout * 3, 30) * 1000),
+            "wait_for_timeout": int(self.wait_timeout * 1000),
+            "exclude_all_images": "image" in self.blocked_types,
+        }
+        selector = self.wait_selector(schema)
+        if selector:
+            options["wait_for"] = f"css:{selector}"
+        return options
+
+    async def install(self, page):
+        """
+        Route Playwright de l'onglet : les ressources bloquées ne quittent jamais le navigateur.
+        Retourne l'écouteur de réponses, à passer à `uninstall`.
+        """
+
+        async def handle(route):
+            request = route.request
+            if self.should_block(request.resource_type, request.url):
+                saved = blocked_bytes(request.resource_type, request.url)
+                self.stats["blocked"] += 1
+                self.stats["bytes_saved"] += saved
+                self.blocked_by_type[request.resource_type] += 1
+                RENDER_BYTES.inc(saved, source=self.source_name, kind="saved")
+                await route.abort()
+            else:
+                await route.continue_()
+
+        def count_bytes(response):
+            length = response.headers.get("content-length")
+            if length and length.isdigit():
+                self.stats["bytes"] += int(length)
+                RENDER_BYTES.inc(int(length), source=self.source_name, kind="downloaded")
+                if len(_known_sizes) < _KNOWN_SIZES_MAX:
+                    _known_sizes[response.url] = int(length)
+
+        await page.route("**/*", handle)
+        page.on("response", count_bytes)
+        return count_bytes
+
+    @staticmethod
+    async def uninstall(page, listener) -> None:
+        """Retire la route et l'écouteur d'un autre profil (onglet réutilisé par une autre source)."""
+        await page.unroute("**/*")
+        page.remove_listener("response", listener)
+
+    def record_render(self, url: str, seconds: float) -> None:
+        self.stats["renders"] += 1
+        self.stats["render_seconds"] += seconds
+        self.page_seconds[url] = seconds
+        RENDER_SECONDS.observe(seconds, source=self.source_name)
+
+    def summary(self) -> Dict[str, Any]:
+        renders = self.stats["renders"]
+        durations = sorted(self.page_seconds.values())
+        slowest = sorted(self.page_seconds.items(), key=lambda item: item[1], reverse=True)[:3]
+        return {
+            **self.stats,
+            "render_seconds": round(self.stats["render_seconds"], 2),
+            "avg_render_seconds": round(self.stats["render_seconds"] / renders, 2) if renders else 0.0,
+            "p95_render_seconds": round(durations[min(len(durations) - 1, int(0.95 * len(durations)))], 2) if durations else 0.0,
+            "slowest_pages": {url: round(seconds, 2) for url, seconds in slowest},
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+
+_profiles: Dict[Any, RenderProfile] = {}
+
+
+def get_render_profile(source) -> RenderProfile:
+    """Profil de rendu de `source` (construit au premier appel)."""
+    key = (type(source), source.name)
+    profile = _profiles.get(key)
+    if profile is None:
+        profile = _profiles[key] = RenderProfile.from_source(source)
+    return profile
@@ -0,0 +1,125 @@
+"""
+Empreintes de contenu des lignes items_cache déjà écrites.
+
+Une offre re-crawlée est re-mappée et ré-upsertée en entier, `raw_data` compris,
+même si rien n'a changé. On garde localement une empreinte par colonne de chaque
+ligne écrite avec succès :
+✅ ligne identique : aucune écriture
+✅ ligne modifiée : seules les colonnes différentes sont envoyées (UPDATE ciblé par item_id)
+✅ colonnes volatiles ignorées (updated_at, created_at, raw_data.scrape_timestamp)
+✅ empreintes rangées par base Supabase + table : deux projets ne se mélangent pas
+
+Désactivable avec CRAWL_CHANGE_DETECTION=0 ; `clear()` force une réécriture complète.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+# Colonnes qui changent à chaque écriture sans que l'offre change
+VOLATILE_COLUMNS = {"created_at", "updated_at"}
+VOLATILE_RAW_KEYS = {"scrape_timestamp"}
+
+
+def _hash(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def column_hashes(row: Dict[str, Any]) -> Dict[str, str]:
+    """Empreinte de chaque colonne significative d'une ligne mappée."""
+    hashes = {}
+    for column, value in row.items():
+        if column == "item_id" or column in VOLATILE_COLUMNS:
+            continue
+        if column == "raw_data" and isinstance(value, dict):
+            value = {k: v for k, v in value.items() if k not in VOLATILE_RAW_KEYS}
+        hashes[column] = _hash(value)
+    return hashes
+
+
+def row_fingerprint(hashes: Dict[str, str]) -> str:
+    """Empreinte globale stable d'une ligne, à partir des empreintes de colonnes."""
+    return _hash(sorted(hashes.items()))
+
+
+def changed_columns(row: Dict[str, Any], hashes: Dict[str, str],
+                    stored: Optional[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    """
+    Ligne à envoyer : None si rien n'a changé, la ligne complète si elle est
+    inconnue, sinon item_id + les colonnes dont l'empreinte diffère.
+    """
+    if stored is None:
+        return row
+    diff = [column for column, digest in hashes.items() if stored.get(column) != digest]
+    if not diff:
+        return None
+    partial = {"item_id": row["item_id"]}
+    for column in diff:
+        partial[column] = row[column]
+    return partial
+
+
+class RowFingerprints:
+    """Empreintes par (namespace, item_id), stockées dans SQLite."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CRAWL_FINGERPRINT_DB", "crawl_state.sqlite3")
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS row_fingerprints (namespace TEXT NOT NULL, item_id TEXT NOT NULL, "
+            "fingerprint TEXT NOT NULL, columns TEXT NOT NULL, PRIMARY KEY (namespace, item_id)) WITHOUT ROWID"
+        )
+        self._lock = threading.Lock()
+
+    def get_many(self, namespace: str, item_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        ids = list(item_ids)
+        found = {}
+        with self._lock:
+            # Par paquets pour rester sous la limite de variables SQLite
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for item_id, columns in self.conn.execute(
+                    f"SELECT item_id, columns FROM row_fingerprints WHERE namespace = ? AND item_id IN ({marks})",
+                    [namespace, *chunk],
+                ):
+                    found[item_id] = json.loads(columns)
+        return found
+
+    def put_many(self, namespace: str, rows: Dict[str, Dict[str, str]]) -> None:
+        """Enregistre les empreintes complètes des lignes écrites avec succès."""
+        if not rows:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO row_fingerprints (namespace, item_id, fingerprint, columns) VALUES (?, ?, ?, ?)",
+                ((namespace, item_id, row_fingerprint(hashes), json.dumps(hashes, sort_keys=True))
+                 for item_id, hashes in rows.items()),
+            )
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self.conn.execute("DELETE FROM row_fingerprints")
+            else:
+                self.conn.execute("DELETE FROM row_fingerprints WHERE namespace = ?", (namespace,))
+
+
+_fingerprints: Optional[RowFingerprints] = None
+
+
+def get_row_fingerprints() -> Optional[RowFingerprints]:
+    """Store d'empreintes unique du processus, ou None si CRAWL_CHANGE_DETECTION=0."""
+    global _fingerprints
+    if os.getenv("CRAWL_CHANGE_DETECTION", "1") != "1":
+        return None
+    if _fingerprints is None:
+        _fingerprints = RowFingerprints()
+    return _fingerprints
@@ -0,0 +1,148 @@
+"""
+Planificateur de requêtes partagé par tout le processus (politesse par hôte).
+
+Chaque requête (listing, détail, pagination) passe par `RequestScheduler.acquire`
+avant d'être envoyée :
+✅ un token bucket par hôte (débit + rafale configurables)
+✅ le `Crawl-delay` du robots.txt de l'hôte, mis en cache
+✅ des compteurs de file d'attente et de temps d'attente par hôte
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+
+class TokenBucket:
+    """Token bucket simple : `rate` jetons par seconde, au plus `capacity` en réserve."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Consomme un jeton et retourne le temps à attendre avant de l'utiliser."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class _HostState:
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.lock = asyncio.Lock()
+        self.robots_checked_at: Optional[float] = None
+        self.crawl_delay: Optional[float] = None
+        self.requests = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class RequestScheduler:
+    """
+    Planificateur de politesse par hôte.
+
+    Configurable via CRAWL_RATE_PER_HOST (requêtes/seconde), CRAWL_BURST_PER_HOST,
+    CRAWL_RESPECT_ROBOTS (1/0) et CRAWL_ROBOTS_TTL (secondes).
+    """
+
+    def __init__(self, rate_per_host=None, burst_per_host=None, respect_robots=None, robots_ttl=None):
+        self.rate_per_host = rate_per_host or float(os.getenv("CRAWL_RATE_PER_HOST", "2"))
+        self.burst_per_host = burst_per_host or float(os.getenv("CRAWL_BURST_PER_HOST", "4"))
+        if respect_robots is None:
+            respect_robots = os.getenv("CRAWL_RESPECT_ROBOTS", "1") == "1"
+        self.respect_robots = respect_robots
+        self.robots_ttl = robots_ttl or float(os.getenv("CRAWL_ROBOTS_TTL", "3600"))
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _host_state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(TokenBucket(self.rate_per_host, self.burst_per_host))
+        return state
+
+    async def _refresh_robots(self, url: str, state: _HostState, session) -> None:
+        """Lit (ou relit après expiration) le Crawl-delay du robots.txt de l'hôte."""
+        now = time.monotonic()
+        if state.robots_checked_at is not None and now - state.robots_checked_at < self.robots_ttl:
+            return
+        state.robots_checked_at = now
+        parsed = urlparse(url)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        crawl_delay = None
+        try:
+            async with session.get(robots_url) as resp:
+                if resp.status == 200:
+                    parser = RobotFileParser()
+                    parser.parse((await resp.text()).splitlines())
+                    crawl_delay = parser.crawl_delay("*")
+        except Exception as e:
+            print(f"[SCHEDULER] robots.txt indisponible pour {parsed.netloc}: {e}")
+        state.crawl_delay = float(crawl_delay) if crawl_delay else None
+        if state.crawl_delay:
+            # Le Crawl-delay plafonne le débit et interdit les rafales
+            rate = min(self.rate_per_host, 1.0 / state.crawl_delay)
+            state.bucket = TokenBucket(rate, 1)
+            print(f"[SCHEDULER] {parsed.netloc}: Crawl-delay {state.crawl_delay}s respecté")
+        else:
+            state.bucket = TokenBucket(self.rate_per_host, self.burst_per_host)
+
+    async def acquire(self, url: str, session=None) -> float:
+        """Attend le droit d'envoyer une requête vers l'hôte de `url`. Retourne le temps attendu."""
+        host = urlparse(url).netloc
+        state = self._host_state(host)
+        state.queue_depth += 1
+        state.max_queue_depth = max(state.max_queue_depth, state.queue_depth)
+        started = time.monotonic()
+        try:
+            # Le verrou garantit un ordre FIFO entre les requêtes d'un même hôte
+            async with state.lock:
+                if self.respect_robots and session is not None:
+                    await self._refresh_robots(url, state, session)
+                delay = state.bucket.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        finally:
+            state.queue_depth -= 1
+        waited = time.monotonic() - started
+        state.requests += 1
+        state.total_wait += waited
+        state.max_wait = max(state.max_wait, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Compteurs par hôte : requêtes, profondeur de file, temps d'attente."""
+        return {
+            host: {
+                "requests": state.requests,
+                "queue_depth": state.queue_depth,
+                "max_queue_depth": state.max_queue_depth,
+                "total_wait_s": round(state.total_wait, 3),
+                "avg_wait_s": round(state.total_wait / state.requests, 3) if state.requests else 0.0,
+                "max_wait_s": round(state.max_wait, 3),
+                "crawl_delay": state.crawl_delay,
+            }
+            for host, state in self._hosts.items()
+        }
+
+
+_scheduler: Optional[RequestScheduler] = None
+
+
+def get_scheduler() -> RequestScheduler:
+    """Retourne le planificateur unique du processus."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler()
+    return _scheduler
@@ -0,0 +1,162 @@
+"""
+Compilation des schémas d'extraction CSS.
+
+Les schémas des sources (`get_listing_schema` / `get_detail_schema`) sont des
+dictionnaires de sélecteurs. Les passer tels quels à `select_one` oblige
+soupsieve à reparser chaque sélecteur pour chaque champ de chaque offre.
+Ici chaque schéma est compilé une seule fois par source :
+✅ sélecteurs précompilés (`soupsieve.compile`)
+✅ handler du type de champ choisi à la compilation
+✅ objets compilés mis en cache par source et partagés par tous les points d'entrée
+✅ champs obligatoires (`"required": True`) : une page où ils manquent est incomplète
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import soupsieve as sv
+
+from crawler.utils.html_cleaner import clean_element_text
+
+# Sélecteurs désignant l'élément courant lui-même
+SCOPE_SELECTORS = (None, "", ":scope", ":self")
+
+# Champs HTML des pages de détail convertis en texte propre
+CLEANED_HTML_FIELDS = ("job_description", "profile_required", "description")
+
+
+def _text(field, scope, el):
+    return el.get_text(strip=True)
+
+
+def _attribute(field, scope, el):
+    return el.get(field.attribute)
+
+
+def _html(field, scope, el):
+    # Le texte nettoyé est lu dans l'arbre existant, sans reparser le fragment
+    if field.clean_html:
+        return clean_element_text(el)
+    return str(el)
+
+
+def _text_list(field, scope, el):
+    return [s.get_text(strip=True) for s in field.select(scope)]
+
+
+def _keyword(field, scope, el):
+    text = el.get_text(separator=" ", strip=True).lower()
+    return any(kw in text for kw in field.keywords)
+
+
+def _key_value_list(field, scope, el):
+    items_dict = {}
+    for kv in field.select(scope):
+        label_el = field.label_selector.select_one(kv)
+        value_el = field.value_selector.select_one(kv)
+        if label_el and value_el:
+            items_dict[label_el.get_text(strip=True)] = value_el.get_text(strip=True)
+    return items_dict
+
+
+FIELD_HANDLERS: Dict[str, Callable] = {
+    "text": _text,
+    "attribute": _attribute,
+    "html": _html,
+    "text-list": _text_list,
+    "keyword": _keyword,
+    "key-value-list": _key_value_list,
+}
+
+
+class CompiledField:
+    """Un champ de schéma avec son sélecteur précompilé et son handler."""
+
+    __slots__ = ("name", "type", "selector", "pattern", "attribute", "keywords",
+                 "label_selector", "value_selector", "clean_html", "required", "handler")
+
+    def __init__(self, field: Dict[str, Any], clean_html_fields=()):
+        self.name = field["name"]
+        self.type = field.get("type", "text")
+        self.selector = field.get("selector")
+        self.pattern = None if self.selector in SCOPE_SELECTORS else sv.compile(self.selector)
+        self.attribute = field.get("attribute")
+        self.keywords = [kw.lower() for kw in field.get("keywords", [])]
+        self.label_selector = self.value_selector = None
+        if self.type == "key-value-list":
+            self.label_selector = sv.compile(field.get("label_selector", "strong"))
+            self.value_selector = sv.compile(field.get("value_selector", "span"))
+        self.clean_html = self.name in clean_html_fields
+        self.required = bool(field.get("required", False))
+        self.handler = FIELD_HANDLERS.get(self.type, _text)
+
+    def select_one(self, scope):
+        if self.pattern is None:
+            return scope
+        return self.pattern.select_one(scope)
+
+    def select(self, scope) -> list:
+        if self.pattern is None:
+            return [scope]
+        return self.pattern.select(scope)
+
+    def extract(self, scope, url: Optional[str] = None):
+        # Champ spécial copié depuis la liste
+        if self.type == "url-from-listing":
+            return url
+        el = self.select_one(scope)
+        if not el:
+            return None
+        return self.handler(self, scope, el)
+
+
+class CompiledSchema:
+    """Schéma d'extraction compilé, réutilisable pour toutes les pages d'une source."""
+
+    def __init__(self, schema: Dict[str, Any], clean_html_fields=()):
+        self.schema = schema
+        self.name = schema.get("name")
+        self.base_selector = schema.get("baseSelector")
+        self.base_pattern = None if self.base_selector in SCOPE_SELECTORS else sv.compile(self.base_selector)
+        self.date_field = schema.get("dateField")
+        self.fields: List[CompiledField] = [
+            CompiledField(f, clean_html_fields) for f in schema.get("baseFields", []) + schema.get("fields", [])
+        ]
+        self.required_fields = [field.name for field in self.fields if field.required]
+
+    def select_items(self, root) -> list:
+        """Éléments correspondant au `baseSelector` (les cartes d'offres d'un listing)."""
+        if self.base_pattern is None:
+            return [root]
+        return self.base_pattern.select(root)
+
+    def missing_required(self, item: Dict[str, Any]) -> List[str]:
+        """Champs obligatoires vides dans `item` (page rendue côté client, sélecteur obsolète...)."""
+        return [name for name in self.required_fields if not item.get(name)]
+
+    def extract(self, scope, item: Optional[Dict[str, Any]] = None, url: Optional[str] = None) -> Dict[str, Any]:
+        """Remplit `item` avec les champs extraits de `scope` (élément ou document)."""
+        if item is None:
+            item = {}
+        for field in self.fields:
+            item[field.name] = field.extract(scope, url)
+        return item
+
+
+class SourceSchemas:
+    """Schémas compilés (listing + détail) d'une source."""
+
+    def __init__(self, source):
+        self.listing = CompiledSchema(source.get_listing_schema())
+        self.detail = CompiledSchema(source.get_detail_schema(), clean_html_fields=CLEANED_HTML_FIELDS)
+
+
+_compiled_sources: Dict[Any, SourceSchemas] = {}
+
+
+def get_compiled_schemas(source) -> SourceSchemas:
+    """Retourne les schémas compilés de `source` (compilés au premier appel)."""
+    key = (type(source), source.name)
+    compiled = _compiled_sources.get(key)
+    if compiled is None:
+        compiled = _compiled_sources[key] = SourceSchemas(source)
+    return compiled
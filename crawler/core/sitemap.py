@@ -0,0 +1,144 @@
+"""
+Découverte des offres par sitemap XML (sitemaps WordPress, Yoast...).
+
+Au lieu de parcourir N pages de listing HTML pour apprendre des URLs :
+✅ documents récupérés par le Fetcher (retries, disjoncteur, cache conditionnel, métriques)
+✅ parsing incrémental (XMLPullParser), éléments libérés au fil de la lecture
+✅ index de sitemaps suivis récursivement, sitemaps .xml.gz décompressés
+✅ filtre <lastmod> : seuls les sitemaps et URLs modifiés depuis `since` sont retenus
+✅ une URL sans <lastmod> est écartée quand `since` est connu (pas de date d'arrêt possible)
+"""
+
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+from xml.etree.ElementTree import XMLPullParser
+
+from crawler.core.fetcher import FetchError
+
+CHUNK_SIZE = 64 * 1024
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[datetime]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """<lastmod> W3C (date seule ou date-heure) vers un datetime UTC."""
+    if not value:
+        return None
+    value = value.strip().replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _is_fresh(lastmod: Optional[datetime], since: Optional[datetime]) -> bool:
+    # Sans date, rien ne borne l'archive : une entrée non datée n'est retenue que sans `since`
+    if since is None:
+        return True
+    return lastmod is not None and lastmod > since
+
+
+class SitemapReader:
+    """
+    Parcourt des sitemaps avec le Fetcher du runner : politesse, retries,
+    disjoncteur, cache conditionnel et métriques, comme pour les autres pages.
+
+    Chaque document est récupéré entier puis parsé ; aucun slot de concurrence
+    n'est tenu pendant que le consommateur traite les entrées.
+    """
+
+    def __init__(self, fetcher, session, max_depth: int = 3,
+                 accept_sitemap: Optional[Callable[[str], bool]] = None,
+                 accept_entry: Optional[Callable[[str], bool]] = None):
+        self.fetcher = fetcher
+        self.session = session
+        self.max_depth = max_depth
+        self.accept_sitemap = accept_sitemap or (lambda url: True)
+        self.accept_entry = accept_entry or (lambda url: True)
+        self.stats = {"sitemaps": 0, "bytes": 0, "entries": 0, "fresh": 0, "undated": 0,
+                      "skipped_sitemaps": 0, "errors": 0}
+
+    async def discover(self, sitemap_urls, since: Optional[datetime] = None) -> AsyncIterator[SitemapEntry]:
+        """URLs d'offres modifiées depuis `since`, tous sitemaps confondus."""
+        for url in sitemap_urls:
+            async for entry in self._walk(url, since, 0):
+                yield entry
+
+    async def _walk(self, url: str, since: Optional[datetime], depth: int) -> AsyncIterator[SitemapEntry]:
+        children = []
+        entries = []
+        for kind, entry in await self._read(url):
+            if kind == "sitemap":
+                # Index : un sous-sitemap sans <lastmod> est lu, ses URLs seront filtrées
+                if (entry.lastmod is None or _is_fresh(entry.lastmod, since)) and self.accept_sitemap(entry.loc):
+                    children.append(entry.loc)
+                else:
+                    self.stats["skipped_sitemaps"] += 1
+                continue
+            self.stats["entries"] += 1
+            if entry.lastmod is None:
+                self.stats["undated"] += 1
+            if _is_fresh(entry.lastmod, since) and self.accept_entry(entry.loc):
+                self.stats["fresh"] += 1
+                entries.append(entry)
+        for entry in entries:
+            yield entry
+        if depth >= self.max_depth:
+            return
+        for child in children:
+            async for entry in self._walk(child, since, depth + 1):
+                yield entry
+
+    async def _read(self, url: str) -> List[Tuple[str, SitemapEntry]]:
+        """Entrées ("url" | "sitemap", SitemapEntry) d'un document ; vide si la récupération échoue."""
+        self.stats["sitemaps"] += 1
+        try:
+            if url.endswith(".gz"):
+                body = await self.fetcher.fetch_bytes(self.session, url)
+                # .xml.gz servi tel quel (sinon aiohttp l'a déjà décompressé)
+                if body[:2] == b"\x1f\x8b":
+                    body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            else:
+                body = (await self.fetcher.fetch_text(self.session, url)).encode("utf-8")
+        except (FetchError, zlib.error) as e:
+            self.stats["errors"] += 1
+            print(f"[SITEMAP] {url}: {e}")
+            return []
+        self.stats["bytes"] += len(body)
+        parser = XMLPullParser(events=("end",))
+        events = []
+        for offset in range(0, len(body), CHUNK_SIZE):
+            parser.feed(body[offset:offset + CHUNK_SIZE])
+            events.extend(self._drain(parser))
+        parser.close()
+        events.extend(self._drain(parser))
+        return events
+
+    @staticmethod
+    def _drain(parser: XMLPullParser):
+        for _, elem in parser.read_events():
+            kind = _local(elem.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            loc = lastmod = None
+            for child in elem:
+                name = _local(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = parse_lastmod(child.text)
+            # Élément traité : on libère la mémoire au fil du flux
+            elem.clear()
+            if loc:
+                yield kind, SitemapEntry(loc, lastmod)
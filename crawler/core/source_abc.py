@@ -1,4 +1,6 @@
+import html
 from abc import ABC, abstractmethod
+from urllib.parse import urlparse
 
 class AbstractSource(ABC):
     @property
@@ -6,6 +8,26 @@ class AbstractSource(ABC):
     def name(self) -> str:
         pass
 
+    @property
+    def enabled(self) -> bool:
+        """Une source désactivée n'est pas lancée par la découverte des sources."""
+        return True
+
+    @property
+    def render_mode(self) -> str:
+        """
+        Crawler unifié : "auto" (HTTP d'abord, navigateur si le schéma échoue),
+        "http" (jamais de navigateur) ou "browser" (toujours le navigateur).
+        """
+        return "auto"
+
+    def get_render_profile(self) -> dict:
+        """
+        Surcharges du profil de rendu navigateur (RenderProfile) : blocked_types,
+        blocked_patterns, wait_for, wait_timeout. Vide = profil par défaut.
+        """
+        return {}
+
     @abstractmethod
     def get_listing_urls(self) -> list:
         pass
@@ -22,11 +44,106 @@ class AbstractSource(ABC):
     def get_item_unique_id(self, item_data: dict) -> str:
         pass
 
+    def get_base_url(self) -> str:
+        """URL de base des liens relatifs des listings (défaut : origine de la première URL de listing)."""
+        urls = self.get_listing_urls()
+        if not urls:
+            return ""
+        parts = urlparse(urls[0])
+        return f"{parts.scheme}://{parts.netloc}/"
+
     def get_next_page_url(self, page_html: str, current_url: str) -> str | None:
         return None
 
+    def get_sitemap_urls(self) -> list:
+        """Sitemaps (ou index de sitemaps) des offres ; vide = découverte par les pages de listing."""
+        return []
+
+    def accept_sitemap(self, sitemap_url: str) -> bool:
+        """Sous-sitemaps d'un index à suivre (ex. seulement ceux des articles)."""
+        return True
+
+    def accept_sitemap_entry(self, url: str) -> bool:
+        """URLs du sitemap qui sont des offres."""
+        return True
+
+    def offer_from_sitemap(self, url: str, lastmod) -> dict:
+        """Offre minimale issue du sitemap, complétée par le schéma de détail."""
+        return {"url": url}
+
     def normalize_date(self, raw_date: str) -> str | None:
         return None
 
     def normalize_experience(self, raw_exp: str) -> str | None:
         return None
+
+
+class JsonApiSource(AbstractSource):
+    """
+    Source exposant des collections JSON paginées (ex. API REST WordPress `wp-json`).
+
+    Une requête renvoie le listing et le contenu complet de N offres : pas de page
+    de détail à récupérer. Les offres suivent ensuite le même flux que les sources
+    HTML (déduplication, annotation, enrichissement, export).
+    La conversion d'une réponse en offres (`parse_api_page`) ne dépend que du JSON
+    et se teste directement sur une réponse enregistrée.
+    """
+
+    # Champs dont la valeur est du HTML, convertie en texte propre
+    html_fields: tuple = ("job_description",)
+    # Champ daté utilisé par le filtre de fraîcheur
+    date_field: str = "date_posted"
+
+    @abstractmethod
+    def get_api_urls(self) -> list:
+        """Première page de chaque collection JSON."""
+        pass
+
+    @abstractmethod
+    def get_field_map(self) -> dict:
+        """Champ d'offre -> chemin pointé dans un élément JSON (ex. "title": "title.rendered")."""
+        pass
+
+    def get_listing_urls(self) -> list:
+        return self.get_api_urls()
+
+    def get_listing_schema(self) -> dict:
+        return {}
+
+    def get_detail_schema(self) -> dict:
+        return {"name": f"{self.name}_api", "dateField": self.date_field}
+
+    def get_api_items(self, payload) -> list:
+        """Éléments d'une réponse : la liste elle-même, ou sa clé `items`."""
+        if isinstance(payload, list):
+            return payload
+        return payload.get("items", []) if isinstance(payload, dict) else []
+
+    def get_next_api_url(self, payload, current_url: str) -> str | None:
+        return None
+
+    def normalize_date(self, raw_date: str) -> str | None:
+        # Les API renvoient en général des dates ISO, conservées telles quelles
+        return raw_date
+
+    def map_api_item(self, item: dict) -> dict:
+        """Applique `get_field_map` à un élément JSON."""
+        from crawler.utils.html_cleaner import clean_element_text
+        from crawler.utils.parser_backend import make_soup
+
+        offer = {}
+        for field, path in self.get_field_map().items():
+            value = item
+            for key in path.split("."):
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, str):
+                if field in self.html_fields:
+                    value = clean_element_text(make_soup(value))
+                else:
+                    value = html.unescape(value).strip()
+            offer[field] = value
+        return offer
+
+    def parse_api_page(self, payload) -> list:
+        """Offres d'une réponse JSON."""
+        return [self.map_api_item(item) for item in self.get_api_items(payload)]
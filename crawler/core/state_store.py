@@ -0,0 +1,186 @@
+"""
+Stockage de l'état du crawl (IDs déjà vus, dernière exécution) dans SQLite.
+
+Remplace le fichier monolithique `last_scrap_state.json` :
+✅ base SQLite en mode WAL (lectures concurrentes, écritures courtes)
+✅ une table indexée par source : test d'appartenance sans charger l'historique
+✅ insertions groupées et éviction des IDs plus vieux que MAX_JOB_AGE_DAYS
+✅ curseurs de pagination pour reprendre un crawl interrompu
+✅ frontière : URLs reportées faute de budget et rendement de chaque source
+✅ migration unique depuis l'ancien fichier JSON
+"""
+
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+LEGACY_STATE_FILE = "last_scrap_state.json"
+
+
+class StateStore:
+    """État persistant du crawl, une table `seen_<source>` par source."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("CRAWL_STATE_DB", "crawl_state.sqlite3")
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, last_run_utc TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cursors (source TEXT NOT NULL, start_url TEXT NOT NULL, "
+            "next_url TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (source, start_url))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier (source TEXT NOT NULL, url TEXT NOT NULL, kind TEXT NOT NULL, "
+            "priority REAL NOT NULL, payload TEXT NOT NULL, added_at REAL NOT NULL, PRIMARY KEY (source, url))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS source_yield (name TEXT PRIMARY KEY, value REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._tables = set()
+
+    def _table(self, source: str) -> str:
+        table = "seen_" + re.sub(r"\W", "_", source)
+        if table not in self._tables:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (uid TEXT PRIMARY KEY, seen_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_seen_at ON {table} (seen_at)")
+            self._tables.add(table)
+        return table
+
+    def contains(self, source: str, uid: str) -> bool:
+        row = self.conn.execute(f"SELECT 1 FROM {self._table(source)} WHERE uid = ?", (uid,)).fetchone()
+        return row is not None
+
+    def add_many(self, source: str, uids: Iterable[str], seen_at: Optional[float] = None) -> None:
+        """Insère un lot d'IDs en une transaction (la date du premier passage est conservée)."""
+        seen_at = seen_at or time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO {self._table(source)} (uid, seen_at) VALUES (?, ?)",
+                ((uid, seen_at) for uid in uids),
+            )
+
+    def count(self, source: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self._table(source)}").fetchone()[0]
+
+    def evict_older_than(self, source: str, days: int) -> int:
+        """Supprime les IDs vus il y a plus de `days` jours ; retourne le nombre supprimé."""
+        limit = time.time() - days * 86400
+        cursor = self.conn.execute(f"DELETE FROM {self._table(source)} WHERE seen_at < ?", (limit,))
+        return cursor.rowcount
+
+    def get_last_run(self, source: str) -> Optional[datetime]:
+        row = self.conn.execute("SELECT last_run_utc FROM sources WHERE name = ?", (source,)).fetchone()
+        if not row or not row[0]:
+            return None
+        try:
+            return datetime.fromisoformat(row[0])
+        except ValueError:
+            return None
+
+    def set_last_run(self, source: str, when: datetime) -> None:
+        self.conn.execute(
+            "INSERT INTO sources (name, last_run_utc) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET last_run_utc = excluded.last_run_utc",
+            (source, when.isoformat()),
+        )
+
+    def save_cursor(self, source: str, start_url: str, next_url: str) -> None:
+        """Mémorise la prochaine page de listing à crawler pour `start_url`."""
+        self.conn.execute(
+            "INSERT INTO cursors (source, start_url, next_url, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(source, start_url) DO UPDATE SET next_url = excluded.next_url, updated_at = excluded.updated_at",
+            (source, start_url, next_url, time.time()),
+        )
+
+    def get_cursor(self, source: str, start_url: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT next_url FROM cursors WHERE source = ? AND start_url = ?", (source, start_url)
+        ).fetchone()
+        return row[0] if row else None
+
+    def clear_cursor(self, source: str, start_url: str) -> None:
+        self.conn.execute("DELETE FROM cursors WHERE source = ? AND start_url = ?", (source, start_url))
+
+    def defer_urls(self, source: str, entries: Iterable[tuple]) -> None:
+        """Met de côté des URLs non récupérées : (url, kind, priority, payload JSON-sérialisable)."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO frontier (source, url, kind, priority, payload, added_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(source, url) DO UPDATE SET kind = excluded.kind, priority = excluded.priority, "
+                "payload = excluded.payload",
+                ((source, url, kind, priority, json.dumps(payload, default=str), now)
+                 for url, kind, priority, payload in entries),
+            )
+
+    def take_deferred(self, source: str, max_age_days: Optional[int] = None) -> list:
+        """Retire et retourne les URLs reportées de `source`, plus prioritaires d'abord."""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            if max_age_days is not None:
+                self.conn.execute(
+                    "DELETE FROM frontier WHERE source = ? AND added_at < ?",
+                    (source, time.time() - max_age_days * 86400),
+                )
+            rows = self.conn.execute(
+                "SELECT url, kind, priority, payload FROM frontier WHERE source = ? ORDER BY priority DESC", (source,)
+            ).fetchall()
+            self.conn.execute("DELETE FROM frontier WHERE source = ?", (source,))
+        return [(url, kind, priority, json.loads(payload)) for url, kind, priority, payload in rows]
+
+    def get_source_yield(self, source: str) -> Optional[float]:
+        row = self.conn.execute("SELECT value FROM source_yield WHERE name = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def set_source_yield(self, source: str, value: float) -> None:
+        self.conn.execute(
+            "INSERT INTO source_yield (name, value, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (source, value, time.time()),
+        )
+
+    def migrate_from_json(self, json_path: str = LEGACY_STATE_FILE) -> bool:
+        """
+        Importe une seule fois l'ancien `last_scrap_state.json` (seen_ids + last_run_utc).
+        Le fichier n'est pas modifié ; la migration est marquée dans la table meta.
+        """
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return False
+        if not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[STATE] Migration JSON impossible ({json_path}): {e}")
+            return False
+        for source, src_state in data.items():
+            self.add_many(source, src_state.get("seen_ids", []))
+            last_run = src_state.get("last_run_utc")
+            if last_run and self.get_last_run(source) is None:
+                self.conn.execute("INSERT OR IGNORE INTO sources (name, last_run_utc) VALUES (?, ?)", (source, last_run))
+        self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (datetime.utcnow().isoformat(),))
+        print(f"[STATE] {json_path} migré vers {self.path}")
+        return True
+
+
+_store: Optional[StateStore] = None
+
+
+def get_state_store() -> StateStore:
+    """Retourne le StateStore unique du processus (migration JSON faite à l'ouverture)."""
+    global _store
+    if _store is None:
+        _store = StateStore()
+        _store.migrate_from_json()
+    return _store
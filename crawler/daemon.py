@@ -0,0 +1,236 @@
+"""
+Daemon de crawl : processus résident qui planifie chaque source indépendamment.
+
+run_crawl.py repart de zéro à chaque exécution (sessions, pools, classificateurs,
+client Supabase). Ici tout reste chaud entre deux crawls :
+✅ un SourceRunner par source, réutilisé (cache HTTP, fetcher, enrichisseur, schémas)
+✅ session HTTP, limiteur, pool CPU et drainer du spool partagés pour toute la durée du daemon
+✅ intervalle adaptatif par source : raccourci quand la source publie beaucoup,
+   allongé quand elle est calme, jamais inférieur à CRAWL_DAEMON_LATENCY_FACTOR x la durée du crawl
+✅ interface HTTP locale : GET /status, GET /metrics (format Prometheus),
+   POST /trigger (toutes les sources) ou /trigger/{source}
+
+Usage: python -m crawler.daemon
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from crawler.core.engine import ConcurrencyLimiter, SourceRunner
+from crawler.core.executor import CpuExecutor
+from crawler.core.export_spool import SpoolDrainer
+from crawler.core.http_client import get_shared_http, http_session
+from crawler.core.metrics import get_metrics
+from crawler.run_crawl import discover_sources
+
+
+class SourceSchedule:
+    """Intervalle et historique de crawl d'une source."""
+
+    def __init__(self, runner: SourceRunner, interval: float, min_interval: float, max_interval: float,
+                 target_new: int, latency_factor: float):
+        self.runner = runner
+        self.name = runner.source_key
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new = target_new
+        self.latency_factor = latency_factor
+        self.next_run = time.monotonic()
+        self.running = False
+        # Déclenchement reçu pendant un crawl : relancé dès la fin de celui-ci
+        self.triggered = False
+        self.runs = 0
+        self.failures = 0
+        self.last_stats: Optional[Dict[str, object]] = None
+        self.last_error: Optional[str] = None
+        self.last_finished: Optional[float] = None
+
+    def adapt(self, stats: Dict[str, object]) -> None:
+        """
+        Nouvel intervalle d'après le rendement du dernier crawl : divisé (au plus par 2)
+        quand la source dépasse `target_new` nouvelles offres, multiplié (au plus par 2)
+        quand elle n'en a presque pas.
+        """
+        ratio = (stats["new"] + 1) / (self.target_new + 1)
+        interval = self.interval / min(2.0, max(0.5, ratio))
+        # Une source lente n'est pas relancée aussitôt son crawl terminé
+        interval = max(interval, stats["seconds"] * self.latency_factor)
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def status(self) -> Dict[str, object]:
+        now = time.monotonic()
+        return {
+            "running": self.running,
+            "interval_seconds": round(self.interval),
+            "next_run_in": max(0, round(self.next_run - now)),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_finished_ago": round(now - self.last_finished) if self.last_finished else None,
+            "last_stats": self.last_stats,
+            "last_error": self.last_error,
+        }
+
+
+class CrawlDaemon:
+    """
+    Boucle de planification : lance chaque source quand son échéance arrive
+    (ou sur déclenchement manuel), sans jamais chevaucher deux crawls d'une même source.
+
+    Configurable via CRAWL_DAEMON_INTERVAL (intervalle initial, s), CRAWL_DAEMON_MIN_INTERVAL,
+    CRAWL_DAEMON_MAX_INTERVAL, CRAWL_DAEMON_TARGET_NEW, CRAWL_DAEMON_LATENCY_FACTOR,
+    CRAWL_DAEMON_HOST et CRAWL_DAEMON_PORT.
+    """
+
+    def __init__(self, sources=None):
+        self.sources = discover_sources() if sources is None else sources
+        self.interval = float(os.getenv("CRAWL_DAEMON_INTERVAL", "3600"))
+        self.min_interval = float(os.getenv("CRAWL_DAEMON_MIN_INTERVAL", "600"))
+        self.max_interval = float(os.getenv("CRAWL_DAEMON_MAX_INTERVAL", "21600"))
+        self.target_new = int(os.getenv("CRAWL_DAEMON_TARGET_NEW", "5"))
+        self.latency_factor = float(os.getenv("CRAWL_DAEMON_LATENCY_FACTOR", "4"))
+        self.host = os.getenv("CRAWL_DAEMON_HOST", "127.0.0.1")
+        self.port = int(os.getenv("CRAWL_DAEMON_PORT", "8787"))
+        self.limiter = ConcurrencyLimiter()
+        self.executor = CpuExecutor(source_classes=[type(s) for s in self.sources])
+        self.drainer = SpoolDrainer() if os.getenv("CRAWL_EXPORT_SPOOL", "1") == "1" else None
+        self.schedules: Dict[str, SourceSchedule] = {}
+        for source in self.sources:
+            runner = SourceRunner(source, limiter=self.limiter, executor=self.executor, drainer=self.drainer)
+            self.schedules[runner.source_key] = SourceSchedule(
+                runner, self.interval, self.min_interval, self.max_interval,
+                self.target_new, self.latency_factor,
+            )
+        self.started = time.monotonic()
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._tasks = set()
+
+    # --- Planification ---
+
+    def trigger(self, name: Optional[str] = None) -> list:
+        """Rend une source (ou toutes) immédiatement exigible ; retourne les sources concernées."""
+        names = [name] if name else list(self.schedules)
+        for key in names:
+            schedule = self.schedules[key]
+            schedule.next_run = time.monotonic()
+            schedule.triggered = schedule.running
+        self._wake.set()
+        return names
+
+    async def _run(self, schedule: SourceSchedule) -> None:
+        try:
+            stats = await schedule.runner.crawl()
+            schedule.last_stats = stats
+            schedule.last_error = None
+            schedule.adapt(stats)
+        except Exception as e:
+            schedule.failures += 1
+            schedule.last_error = repr(e)
+            # Échec : on retente plus tard, sans accélérer
+            schedule.interval = min(schedule.max_interval, schedule.interval * 2)
+            print(f"[DAEMON] Échec du crawl {schedule.name}: {e!r}")
+        finally:
+            schedule.runs += 1
+            schedule.running = False
+            schedule.last_finished = time.monotonic()
+            schedule.next_run = schedule.last_finished + (0 if schedule.triggered else schedule.interval)
+            schedule.triggered = False
+            print(f"[DAEMON] {schedule.name}: prochain crawl dans {schedule.interval:.0f}s")
+            self._wake.set()
+
+    async def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for schedule in self.schedules.values():
+                if not schedule.running and schedule.next_run <= now:
+                    schedule.running = True
+                    task = asyncio.create_task(self._run(schedule))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            pending = [s.next_run for s in self.schedules.values() if not s.running]
+            timeout = max(0.0, min(pending) - time.monotonic()) if pending else None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- Interface HTTP ---
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "uptime_seconds": round(time.monotonic() - self.started),
+            "sources": {name: schedule.status() for name, schedule in self.schedules.items()},
+            "http": get_shared_http().pool_stats(),
+            "spool": self.drainer.spool.depth() if self.drainer else None,
+        }
+
+    async def _handle_status(self, request):
+        return web.json_response(self.status(), dumps=lambda data: json.dumps(data, default=str))
+
+    async def _handle_metrics(self, request):
+        if self.drainer:
+            self.drainer.spool.depth()  # jauge du spool à jour au moment du scrape
+        return web.Response(text=get_metrics().render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Prometheus-Format": "0.0.4"})
+
+    async def _handle_trigger(self, request):
+        name = request.match_info.get("source")
+        if name and name not in self.schedules:
+            return web.json_response({"error": f"source inconnue: {name}"}, status=404)
+        return web.json_response({"triggered": self.trigger(name)})
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/status", self._handle_status)
+        app.router.add_get("/metrics", self._handle_metrics)
+        app.router.add_post("/trigger", self._handle_trigger)
+        app.router.add_post("/trigger/{source}", self._handle_trigger)
+        return app
+
+    # --- Cycle de vie ---
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    async def run(self) -> None:
+        print(f"[DAEMON] {len(self.schedules)} source(s): {list(self.schedules)}")
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, self.host, self.port).start()
+        print(f"[DAEMON] Interface sur http://{self.host}:{self.port} (/status, /metrics, /trigger)")
+        stop_draining = asyncio.Event()
+        drainer_task = asyncio.create_task(self.drainer.run(stop_draining)) if self.drainer else None
+        try:
+            # Session HTTP ouverte pour toute la vie du daemon : connexions et DNS restent chauds
+            async with http_session():
+                await self._loop()
+                # Arrêt : les crawls en cours se terminent et enregistrent leur état
+                if self._tasks:
+                    await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            await runner.cleanup()
+            self.executor.shutdown()
+            if drainer_task:
+                stop_draining.set()
+                await drainer_task
+                await self.drainer.finish()
+        print("[DAEMON] Arrêté")
+
+
+if __name__ == '__main__':
+    asyncio.run(CrawlDaemon().run())
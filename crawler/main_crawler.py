@@ -10,8 +10,13 @@ from .llm_enrichment import GeminiEnricher
 from bs4 import BeautifulSoup
 import csv # Ajout pour l'export CSV
 from .supabase_export import upsert_job_to_supabase
+from .core.schema_compiler import CompiledSchema, CLEANED_HTML_FIELDS
+from .utils.document import DocumentContext
 from datetime import datetime
 
+# Schéma de détail compilé une seule fois (sélecteurs précompilés)
+compiled_detail_schema = CompiledSchema(job_detail_extraction_schema, clean_html_fields=CLEANED_HTML_FIELDS)
+
 async def main():
     url = get_target_url()
     if not url:
@@ -133,13 +138,14 @@ async def main():
                             elif 'url' in merged:
                                 merged['application_url'] = merged['url']
                             # Pipeline d'extraction en cascade pour chaque champ du schéma
-                            soup = BeautifulSoup(getattr(detail_result, 'cleaned_html', '') or getattr(detail_result, 'markdown', ''), 'html.parser')
+                            # Parsé à la demande, uniquement si un champ doit passer par la cascade regex
+                            document = DocumentContext(getattr(detail_result, 'cleaned_html', '') or getattr(detail_result, 'markdown', ''))
                             final_fields = {}
                             extraction_sources = {}
                             raw_extracted_fields = {} # Pour l'audit
 
-                            for field in job_detail_extraction_schema["fields"]:
-                                name = field["name"]
+                            for compiled_field in compiled_detail_schema.fields:
+                                name = compiled_field.name
                                 value = merged.get(name)
                                 raw_extracted_fields[name] = value # Capture la valeur brute
 
@@ -149,11 +155,11 @@ async def main():
                                     extraction_sources[name] = "css"
                                     continue
                                 # 2. Regex sur le HTML du bloc parent (si selector existe)
-                                selector = field.get("selector")
+                                selector = compiled_field.selector
                                 parent_html = ""
                                 if selector:
                                     try:
-                                        parent = soup.select_one(selector)
+                                        parent = compiled_field.select_one(document.soup)
                                         if parent:
                                             parent_html = str(parent)
                                     except Exception:
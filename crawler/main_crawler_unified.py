@@ -6,6 +6,8 @@ Ce crawler combine :
 ✅ Le moteur Crawl4AI qui fonctionne (main_crawler.py)
 ✅ Le système multi-sources (AbstractSource)
 ✅ Les améliorations Phase 2 (classification + géolocalisation + nettoyage HTML)
+✅ Les sources et leurs pages de détail rendues en parallèle sur un pool d'onglets
+✅ HTTP d'abord : le navigateur n'est lancé que si le schéma ne trouve pas la page
 
 Usage: python crawler/main_crawler_unified.py
 """
@@ -13,52 +15,41 @@ Usage: python crawler/main_crawler_unified.py
 import asyncio
 import json
 import os
-import importlib
-import pkgutil
 from datetime import datetime
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+from crawl4ai import AsyncWebCrawler, BrowserConfig
 from crawler.models import JobOffer
 from crawler.llm_enrichment import GeminiEnricher
 from crawler.supabase_export import upsert_job_to_supabase
-from crawler.utils.job_classifier import JobClassifier
-from crawler.utils.geo_extractor import GeoExtractor
-from crawler.utils.intelligent_extractor import IntelligentExtractor
-from crawler.utils.html_cleaner import clean_html_content
+from crawler.core.browser_pool import BrowserPool
+from crawler.core.crawl_profile import CrawlProfile
+from crawler.core.engine import ConcurrencyLimiter, SourceRunner
+from crawler.core.executor import CpuExecutor
+from crawler.core.fetcher import Fetcher
+from crawler.core.http_cache import ResponseCache
+from crawler.core.http_client import http_session
+from crawler.core.hybrid_fetch import HybridFetcher
+from crawler.core.metrics import LLM_SECONDS, get_metrics
+from crawler.core.scheduler import get_scheduler
+from crawler.core.source_abc import JsonApiSource
+from crawler.run_crawl import discover_sources as discover_enabled_sources
 from bs4 import BeautifulSoup
 import csv
 
 def discover_sources():
-    """Découvre automatiquement toutes les sources disponibles"""
-    sources = []
-    sources_dir = "crawler.sources"
-    
+    """Découvre les sources activées (même règle que run_crawl : classes concrètes définies dans leur module)"""
     try:
-        import crawler.sources
-        for _, module_name, _ in pkgutil.iter_modules(crawler.sources.__path__):
-            try:
-                module = importlib.import_module(f"{sources_dir}.{module_name}")
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if (isinstance(attr, type) and 
-                        hasattr(attr, '__bases__') and 
-                        any('AbstractSource' in str(base) for base in attr.__bases__)):
-                        try:
-                            source_instance = attr()
-                            sources.append(source_instance)
-                            print(f"✅ Source découverte : {source_instance.name}")
-                        except Exception as e:
-                            print(f"⚠️  Erreur lors de l'initialisation de {attr.__name__}: {e}")
-            except Exception as e:
-                print(f"⚠️  Erreur lors de l'import du module {module_name}: {e}")
+        sources = discover_enabled_sources()
     except Exception as e:
         print(f"❌ Erreur lors de la découverte des sources: {e}")
-    
+        return []
+    for source in sources:
+        print(f"✅ Source découverte : {source.name}")
     return sources
 
-async def process_source(source, crawler, enricher, classifier, geo_extractor, intelligent_extractor, audit_records):
+async def process_source(profile, hybrid, enricher, cpu_executor, audit_records):
     """Traite une source spécifique avec toutes les améliorations Phase 2"""
     
+    source = profile.source
     print(f"\n🔍 === TRAITEMENT SOURCE: {source.name.upper()} ===")
     
     LAST_SCRAP_FILE = "last_scrap.json"
@@ -84,213 +75,159 @@ async def process_source(source, crawler, enricher, classifier, geo_extractor, i
     
     total_processed = 0
     
+    async def process_item(i, item, count):
+        job_url = item.get("url")
+        if not job_url:
+            print(f"Offre {i+1} sans URL, ignorée.")
+            return 0
+        
+        print(f"\n--- Offre {i+1}/{count} ---")
+        print(f"🔗 URL: {job_url}")
+        
+        # === CRAWL DES DÉTAILS DE L'OFFRE ===
+        print("📄 Récupération des détails...")
+        detail_html = None  # Initialiser la variable
+        try:
+            # Lien relatif du listing résolu sur l'URL de base de la source
+            detail_url = profile.absolute_url(job_url)
+            
+            # HTTP + schéma compilé, navigateur seulement si le schéma ne trouve pas la page
+            detail_data, detail_html = await hybrid.detail(source, detail_url, profile.detail_config)
+            
+            if detail_data:
+                # Fusionner les données de listing avec les détails
+                item.update(detail_data)
+                print("   └─ ✅ Détails récupérés")
+            else:
+                print("   └─ ⚠️  Échec récupération détails")
+                
+        except Exception as e:
+            print(f"   └─ ❌ Erreur crawl détails: {e}")
+            detail_html = None  # S'assurer que detail_html est None en cas d'erreur
+        
+        # === AMÉLIORATIONS PHASE 2 ===
+        
+        # Extraction intelligente, classification, géolocalisation et nettoyage :
+        # traitement CPU, exécuté dans un worker si le pool de processus est activé
+        print("🧠 Extraction intelligente, classification, géolocalisation, nettoyage HTML...")
+        item, intelligent_data, geo_result = await cpu_executor.enhance_unified_item(detail_html, item)
+        
+        # 0. EXTRACTION INTELLIGENTE DES DONNÉES MANQUANTES
+        if detail_html:
+            print(f"   └─ ✅ Données complétées intelligemment")
+            
+            # Afficher les nouvelles données trouvées
+            new_data_found = []
+            if intelligent_data.get('company_name'):
+                new_data_found.append(f"Entreprise: {intelligent_data['company_name'][:30]}...")
+            if intelligent_data.get('salary'):
+                new_data_found.append(f"Salaire: {intelligent_data['salary'][:20]}...")
+            if intelligent_data.get('contract_type'):
+                new_data_found.append(f"Contrat: {intelligent_data['contract_type']}")
+            if intelligent_data.get('contact_email'):
+                new_data_found.append(f"Email: {intelligent_data['contact_email']}")
+            
+            if new_data_found:
+                for data in new_data_found[:3]:  # Afficher max 3 éléments
+                    print(f"     📋 {data}")
+        
+        # 1. CLASSIFICATION AUTOMATIQUE
+        print(f"   └─ Catégorie: {item['offer_category']}")
+        
+        # 2. EXTRACTION GÉOGRAPHIQUE
+        if geo_result['city']:
+            print(f"   └─ Ville: {geo_result['city']}, Région: {geo_result['region']}")
+        if geo_result['is_remote']:
+            print(f"   └─ Télétravail détecté: {geo_result['is_remote']}")
+        
+        # === ENRICHISSEMENT LLM (SI DISPONIBLE) ===
+        if enricher:
+            print("🤖 Enrichissement LLM...")
+            try:
+                with LLM_SECONDS.time(source=source.name):
+                    enriched_data = await enricher.enrich_job_offer(item)
+                item.update(enriched_data)
+                print("   └─ ✅ Enrichissement LLM appliqué")
+            except Exception as e:
+                print(f"   └─ ⚠️  Enrichissement LLM échoué: {e}")
+        
+        # === EXPORT VERS SUPABASE ===
+        print("💾 Export vers Supabase...")
+        try:
+            # Normaliser la date si nécessaire
+            normalized_date = item.get('date_posted')
+            if normalized_date and hasattr(source, 'normalize_date'):
+                normalized_date = source.normalize_date(normalized_date)
+            
+            # Créer un objet JobOffer avec les données enrichies
+            job_offer = JobOffer(
+                title=item.get('title', ''),
+                company_name=item.get('company_name', ''),
+                location=item.get('location', ''),
+                job_description=item.get('job_description', ''),
+                source_url=detail_url,
+                date_posted=normalized_date,
+                # Nouveaux champs Phase 2
+                offer_category=item.get('offer_category'),
+                detected_city=item.get('detected_city'),
+                detected_region=item.get('detected_region'),
+                detected_latitude=item.get('detected_latitude'),
+                detected_longitude=item.get('detected_longitude'),
+                remote_work_detected=item.get('remote_work_detected', False),
+                # Champs enrichis LLM
+                company_logo_url=item.get('company_logo_url'),
+                company_website=item.get('company_website'),
+                company_description=item.get('company_description'),
+                skills=item.get('skills'),
+                salary=item.get('salary'),
+                languages=item.get('languages'),
+                sector=item.get('sector'),
+                education_level=item.get('education_level'),
+                experience_level=item.get('experience_level'),
+                contract_type=item.get('contract_type'),
+                remote_possible=item.get('remote_possible')
+            )
+            
+            # Convertir l'objet JobOffer en dictionnaire pour Supabase
+            job_dict = job_offer.model_dump()
+            
+            # Export vers Supabase
+            success = upsert_job_to_supabase(job_dict)
+            if success:
+                print("   └─ ✅ Sauvegardé en base de données")
+            else:
+                print("   └─ ❌ Échec sauvegarde base de données")
+            
+        except Exception as e:
+            print(f"   └─ ❌ Erreur export Supabase: {e}")
+        
+        print("✅ Offre traitée avec améliorations Phase 2")
+        return 1
+
     for listing_url in source.get_listing_urls():
         print(f"\n📋 Crawling listing: {listing_url}")
         
-        listing_schema = source.get_listing_schema()
-        extraction = JsonCssExtractionStrategy(listing_schema)
-        crawl_cfg = CrawlerRunConfig(
-            extraction_strategy=extraction,
-            cache_mode=CacheMode.BYPASS,
-            remove_overlay_elements=True,
-            exclude_external_links=True,
-            verbose=True,
-            wait_for=f"css={listing_schema['baseSelector']}"
-        )
-        
-        result = await crawler.arun(listing_url, config=crawl_cfg)
+        try:
+            data, _ = await hybrid.listing(source, listing_url, profile.listing_config)
+        except Exception as e:
+            print(f"❌ Échec crawl listing {listing_url}: {e}")
+            continue
         
-        if not result.success or not result.extracted_content:
+        if not data:
             print(f"❌ Échec crawl listing {listing_url}")
             continue
             
         try:
-            data = json.loads(result.extracted_content)
             print(f"📊 {len(data)} offres extraites du listing")
             
-            for i, item in enumerate(data):
-                job_url = item.get("url")
-                if not job_url:
-                    print(f"Offre {i+1} sans URL, ignorée.")
-                    continue
-                
-                print(f"\n--- Offre {i+1}/{len(data)} ---")
-                print(f"🔗 URL: {job_url}")
-                
-                # === CRAWL DES DÉTAILS DE L'OFFRE ===
-                print("📄 Récupération des détails...")
-                detail_result = None  # Initialiser la variable
-                try:
-                    # Construire l'URL complète si nécessaire
-                    if not job_url.startswith('http'):
-                        if source.name == "emploi_tg":
-                            detail_url = f"https://www.emploi.tg{job_url}"
-                        elif source.name == "emploitogo_info":
-                            detail_url = job_url  # Déjà une URL complète
-                        else:
-                            detail_url = f"https://{source.name}.com{job_url}"
-                    else:
-                        detail_url = job_url
-                    
-                    # Configuration pour le crawl des détails
-                    detail_schema = source.get_detail_schema()
-                    detail_extraction = JsonCssExtractionStrategy(detail_schema)
-                    detail_crawl_cfg = CrawlerRunConfig(
-                        extraction_strategy=detail_extraction,
-                        cache_mode=CacheMode.BYPASS,
-                        remove_overlay_elements=True,
-                        exclude_external_links=True,
-                        verbose=False,  # Moins verbeux pour les détails
-                        wait_for=f"css={detail_schema['baseSelector']}"
-                    )
-                    
-                    detail_result = await crawler.arun(detail_url, config=detail_crawl_cfg)
-                    
-                    if detail_result.success and detail_result.extracted_content:
-                        try:
-                            detail_data = json.loads(detail_result.extracted_content)
-                            if isinstance(detail_data, list) and len(detail_data) > 0:
-                                detail_data = detail_data[0]  # Prendre le premier élément
-                            
-                            # Fusionner les données de listing avec les détails
-                            item.update(detail_data)
-                            print("   └─ ✅ Détails récupérés")
-                        except json.JSONDecodeError:
-                            print("   └─ ⚠️  Erreur parsing JSON détails")
-                    else:
-                        print("   └─ ⚠️  Échec récupération détails")
-                        
-                except Exception as e:
-                    print(f"   └─ ❌ Erreur crawl détails: {e}")
-                    detail_result = None  # S'assurer que detail_result est None en cas d'erreur
-                
-                # === AMÉLIORATIONS PHASE 2 ===
-                
-                # 0. EXTRACTION INTELLIGENTE DES DONNÉES MANQUANTES
-                print("🧠 Extraction intelligente des données...")
-                if detail_result and detail_result.html:
-                    # Utiliser l'extracteur intelligent pour compléter les données manquantes
-                    intelligent_data = intelligent_extractor.extract_all_data(detail_result.html, item)
-                    
-                    # Fusionner les données intelligentes avec les données existantes
-                    for key, value in intelligent_data.items():
-                        if value and (not item.get(key) or len(str(value)) > len(str(item.get(key, '')))):
-                            item[key] = value
-                    
-                    print(f"   └─ ✅ Données complétées intelligemment")
-                    
-                    # Afficher les nouvelles données trouvées
-                    new_data_found = []
-                    if intelligent_data.get('company_name'):
-                        new_data_found.append(f"Entreprise: {intelligent_data['company_name'][:30]}...")
-                    if intelligent_data.get('salary'):
-                        new_data_found.append(f"Salaire: {intelligent_data['salary'][:20]}...")
-                    if intelligent_data.get('contract_type'):
-                        new_data_found.append(f"Contrat: {intelligent_data['contract_type']}")
-                    if intelligent_data.get('contact_email'):
-                        new_data_found.append(f"Email: {intelligent_data['contact_email']}")
-                    
-                    if new_data_found:
-                        for data in new_data_found[:3]:  # Afficher max 3 éléments
-                            print(f"     📋 {data}")
-                
-                # 1. CLASSIFICATION AUTOMATIQUE
-                print("🏷️  Classification automatique...")
-                classification_result = classifier.classify_offer(
-                    item.get('title', ''),
-                    item.get('job_description', ''),
-                    item.get('company_name', '')
-                )
-                item['offer_category'] = classification_result
-                print(f"   └─ Catégorie: {classification_result}")
-                
-                # 2. EXTRACTION GÉOGRAPHIQUE
-                print("🌍 Extraction géographique...")
-                location_text = f"{item.get('location', '')} {item.get('job_description', '')}"
-                geo_result = geo_extractor.extract_location_info(location_text)
-                
-                # Ajouter les données géographiques
-                item['detected_city'] = geo_result['city']
-                item['detected_region'] = geo_result['region']
-                item['detected_latitude'] = geo_result['latitude']
-                item['detected_longitude'] = geo_result['longitude']
-                item['remote_work_detected'] = geo_result['is_remote']
-                
-                if geo_result['city']:
-                    print(f"   └─ Ville: {geo_result['city']}, Région: {geo_result['region']}")
-                if geo_result['is_remote']:
-                    print(f"   └─ Télétravail détecté: {geo_result['is_remote']}")
-                
-                # 3. NETTOYAGE HTML
-                print("🧹 Nettoyage HTML...")
-                if item.get('job_description'):
-                    item['job_description'] = clean_html_content(item['job_description'])
-                
-                # === ENRICHISSEMENT LLM (SI DISPONIBLE) ===
-                if enricher:
-                    print("🤖 Enrichissement LLM...")
-                    try:
-                        enriched_data = await enricher.enrich_job_offer(item)
-                        item.update(enriched_data)
-                        print("   └─ ✅ Enrichissement LLM appliqué")
-                    except Exception as e:
-                        print(f"   └─ ⚠️  Enrichissement LLM échoué: {e}")
-                
-                # === EXPORT VERS SUPABASE ===
-                print("💾 Export vers Supabase...")
-                try:
-                    # Normaliser la date si nécessaire
-                    normalized_date = item.get('date_posted')
-                    if normalized_date and hasattr(source, 'normalize_date'):
-                        normalized_date = source.normalize_date(normalized_date)
-                    
-                    # Créer un objet JobOffer avec les données enrichies
-                    job_offer = JobOffer(
-                        title=item.get('title', ''),
-                        company_name=item.get('company_name', ''),
-                        location=item.get('location', ''),
-                        job_description=item.get('job_description', ''),
-                        source_url=detail_url,
-                        date_posted=normalized_date,
-                        # Nouveaux champs Phase 2
-                        offer_category=item.get('offer_category'),
-                        detected_city=item.get('detected_city'),
-                        detected_region=item.get('detected_region'),
-                        detected_latitude=item.get('detected_latitude'),
-                        detected_longitude=item.get('detected_longitude'),
-                        remote_work_detected=item.get('remote_work_detected', False),
-                        # Champs enrichis LLM
-                        company_logo_url=item.get('company_logo_url'),
-                        company_website=item.get('company_website'),
-                        company_description=item.get('company_description'),
-                        skills=item.get('skills'),
-                        salary=item.get('salary'),
-                        languages=item.get('languages'),
-                        sector=item.get('sector'),
-                        education_level=item.get('education_level'),
-                        experience_level=item.get('experience_level'),
-                        contract_type=item.get('contract_type'),
-                        remote_possible=item.get('remote_possible')
-                    )
-                    
-                    # Convertir l'objet JobOffer en dictionnaire pour Supabase
-                    job_dict = job_offer.model_dump()
-                    
-                    # Export vers Supabase
-                    success = upsert_job_to_supabase(job_dict)
-                    if success:
-                        print("   └─ ✅ Sauvegardé en base de données")
-                    else:
-                        print("   └─ ❌ Échec sauvegarde base de données")
-                    
-                except Exception as e:
-                    print(f"   └─ ❌ Erreur export Supabase: {e}")
-                
-                print("✅ Offre traitée avec améliorations Phase 2")
-                total_processed += 1
-                    
+            # Détails dispatchés en parallèle : le pool d'onglets borne la concurrence
+            processed = await asyncio.gather(
+                *(process_item(i, item, len(data)) for i, item in enumerate(data))
+            )
+            total_processed += sum(processed)
+            
         except Exception as e:
-            print(f"❌ Erreur décodage JSON listing: {e}")
+            print(f"❌ Erreur traitement listing: {e}")
             continue
     
     set_last_scrap(datetime.now().isoformat())
@@ -310,11 +247,12 @@ async def main():
     print("✅ Export: Supabase activé")
     print("=" * 60)
     
-    browser_cfg = BrowserConfig(headless=True, verbose=True, text_mode=True)
+    # text_mode : pas d'images ; light_mode : fonctionnalités d'arrière-plan du navigateur coupées
+    browser_cfg = BrowserConfig(headless=True, verbose=True, text_mode=True, light_mode=True)
     
-    classifier = JobClassifier()
-    geo_extractor = GeoExtractor()
-    intelligent_extractor = IntelligentExtractor()
+    # Classification, géolocalisation et extraction intelligente : en ligne ou dans
+    # un pool de processus (CRAWL_PROCESS_POOL=1), outils initialisés une fois par worker
+    cpu_executor = CpuExecutor()
     print("✅ Classification et géolocalisation initialisées")
     
     ENRICH_LLM = True
@@ -333,27 +271,66 @@ async def main():
         return
     
     print(f"📋 {len(sources)} source(s) découverte(s)")
+    # Sources JSON : rien à rendre, elles passent par le moteur HTTP (SourceRunner)
+    api_sources = [source for source in sources if isinstance(source, JsonApiSource)]
+    # Stratégies, configurations de rendu et URL de base construites une fois par source
+    profiles = [CrawlProfile(source) for source in sources if not isinstance(source, JsonApiSource)]
     
     audit_records = []
     total_global = 0
     
-    async with AsyncWebCrawler(config=browser_cfg) as crawler:
+    # Cache HTTP partagé avec le moteur aiohttp (désactivable avec CRAWL_HTTP_CACHE=0)
+    response_cache = ResponseCache() if os.getenv("CRAWL_HTTP_CACHE", "1") == "1" else None
+    
+    async with AsyncWebCrawler(config=browser_cfg) as crawler, http_session() as shared_session:
         print("\n🔥 DÉBUT DU CRAWLING MULTI-SOURCES")
+        # Onglets partagés par toutes les sources (CRAWL_BROWSER_PAGES, CRAWL_BROWSER_PER_HOST)
+        browser_pool = BrowserPool(crawler)
+        # HTTP d'abord (politesse, retries, cache), navigateur quand le schéma échoue
+        fetcher = Fetcher(ConcurrencyLimiter(), get_scheduler(), response_cache)
+        # Pages rendues : navigation vers la vraie URL (origine, plafond d'hôte, profil de
+        # rendu) ; le cache HTTP ne sert que le chemin HTTP, une 304 y est parsée sans navigateur
+        hybrid = HybridFetcher(fetcher, shared_session, browser_pool)
         
-        for source in sources:
+        async def run_source(profile):
             try:
-                processed = await process_source(
-                    source, crawler, enricher, classifier, geo_extractor, intelligent_extractor, audit_records
-                )
-                total_global += processed
+                return await process_source(profile, hybrid, enricher, cpu_executor, audit_records)
+            except Exception as e:
+                print(f"❌ Erreur source {profile.name}: {e}")
+                return 0
+        
+        async def run_api_source(source):
+            try:
+                stats = await SourceRunner(source, executor=cpu_executor).crawl()
             except Exception as e:
                 print(f"❌ Erreur source {source.name}: {e}")
-                continue
+                return 0
+            return stats["new"]
+        
+        try:
+            # Sources crawlées en parallèle sur le même pool d'onglets
+            total_global = sum(await asyncio.gather(
+                *(run_source(profile) for profile in profiles),
+                *(run_api_source(source) for source in api_sources),
+            ))
+        finally:
+            await browser_pool.close()
+    
+    cpu_executor.shutdown()
     
     print(f"\n🎉 CRAWLING TERMINÉ")
     print("=" * 60)
     print(f"📊 Total offres traitées: {total_global}")
     print(f"📋 Sources traitées: {len(sources)}")
+    print(f"🌐 Onglets navigateur: {browser_pool.summary()}")
+    for profile in profiles:
+        print(f"🔀 HTTP/navigateur {profile.name}: {hybrid.summary(profile.name)}")
+        print(f"🎨 Rendu {profile.name}: {profile.render.summary()}")
+    if response_cache:
+        print(f"🗄️  Cache HTTP: {response_cache.stats} (hit rate {response_cache.hit_rate():.0%})")
+    metrics_path = get_metrics().write_file()
+    if metrics_path:
+        print(f"📈 Métriques (Prometheus): {metrics_path}")
     
     print("🎯 CRAWLER UNIFIÉ TERMINÉ AVEC SUCCÈS!")
 
@@ -1,5 +1,6 @@
 import asyncio
 import importlib
+import inspect
 import pkgutil
 import os
 import sys
@@ -9,7 +10,13 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from crawler.core.engine import SourceRunner
+from crawler.core.engine import SourceRunner, ConcurrencyLimiter
+from crawler.core.executor import CpuExecutor
+from crawler.core.export_spool import SpoolDrainer
+from crawler.core.fetcher import get_circuit_breaker
+from crawler.core.http_client import http_session
+from crawler.core.metrics import get_metrics
+from crawler.core.scheduler import get_scheduler
 
 # Découverte dynamique des plugins sources
 SOURCES_DIR = os.path.join(os.path.dirname(__file__), 'sources')
@@ -22,18 +29,46 @@ def discover_sources():
         module = importlib.import_module(f'crawler.sources.{module_name}')
         for attr in dir(module):
             obj = getattr(module, attr)
-            if isinstance(obj, type):
+            # Classes définies dans ce module seulement (pas les bases importées)
+            if isinstance(obj, type) and obj.__module__ == module.__name__ and not inspect.isabstract(obj):
                 # Hérite de AbstractSource ?
                 bases = [base.__name__ for base in obj.__mro__]
                 if 'AbstractSource' in bases and obj.__name__ != 'AbstractSource':
-                    sources.append(obj())
+                    source = obj()
+                    if source.enabled:
+                        sources.append(source)
     return sources
 
 async def main():
     sources = discover_sources()
     print(f"[INFO] Sources découvertes: {[type(s).__name__ for s in sources]}")
-    runners = [SourceRunner(source) for source in sources]
-    await asyncio.gather(*(runner.crawl() for runner in runners))
+    # Limites de concurrence partagées par toutes les sources
+    limiter = ConcurrencyLimiter()
+    # Pool de processus partagé (CRAWL_PROCESS_POOL=1), schémas préchargés dans chaque worker
+    executor = CpuExecutor(source_classes=[type(s) for s in sources])
+    # Un seul drainer pousse le spool d'export vers Supabase pendant que les sources crawlent
+    drainer = SpoolDrainer() if os.getenv("CRAWL_EXPORT_SPOOL", "1") == "1" else None
+    stop_draining = asyncio.Event()
+    drainer_task = asyncio.create_task(drainer.run(stop_draining)) if drainer else None
+    runners = [SourceRunner(source, limiter=limiter, executor=executor, drainer=drainer) for source in sources]
+    try:
+        # La session HTTP reste ouverte d'une source à l'autre : connexions et DNS réutilisés
+        async with http_session():
+            await asyncio.gather(*(runner.crawl() for runner in runners))
+    finally:
+        executor.shutdown()
+        if drainer_task:
+            stop_draining.set()
+            await drainer_task
+            await drainer.finish()
+    for host, stats in get_scheduler().stats().items():
+        print(f"[SCHEDULER] {host}: {stats}")
+    for host, stats in get_circuit_breaker().stats().items():
+        print(f"[BREAKER] {host}: {stats}")
+    # Exposition finale (CRAWL_METRICS_FILE), export et spool compris
+    path = get_metrics().write_file()
+    if path:
+        print(f"[METRICS] Métriques écrites dans {path}")
 
 if __name__ == '__main__':
     asyncio.run(main())
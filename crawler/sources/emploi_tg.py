@@ -15,7 +15,7 @@ class EmploiTgSource(AbstractSource):
             "name": "JobOffersTG",
             "baseSelector": "div.card.card-job",  # CORRIGÉ: Nouveau sélecteur trouvé
             "baseFields": [
-                {"name": "url", "selector": "a[href*='/offre-emploi-togo/']", "type": "attribute", "attribute": "href"}
+                {"name": "url", "selector": "a[href*='/offre-emploi-togo/']", "type": "attribute", "attribute": "href", "required": True}
             ],
             "fields": [
                 {"name": "title", "selector": "a[href*='/offre-emploi-togo/']", "type": "text"},
@@ -32,7 +32,7 @@ class EmploiTgSource(AbstractSource):
             "baseSelector": "body",
             "fields": [
                 # === INFORMATIONS PRINCIPALES ===
-                {"name": "title", "selector": "h1.text-center, h1.job-title, h1", "type": "text"},
+                {"name": "title", "selector": "h1.text-center, h1.job-title, h1", "type": "text", "required": True},
                 {"name": "company_name", "selector": ".company-name, .employer-name, .card-block-company h3, .job-info .company", "type": "text"},
                 {"name": "location", "selector": ".job-location, .location, .address", "type": "text"},
                 {"name": "date_posted", "selector": ".date-posted, .job-date, .publication-date", "type": "text"},
@@ -1,3 +1,5 @@
+import os
+
 from crawler.core.source_abc import AbstractSource
 from crawler.extraction_schemas import job_offer_extraction_schema, job_detail_extraction_schema
 
@@ -6,16 +8,29 @@ class EmploitogoInfoSource(AbstractSource):
     def name(self):
         return "emploitogo_info"
 
+    @property
+    def enabled(self):
+        # Remplacée par la source API (emploitogo_info_api) si EMPLOITOGO_INFO_API=1
+        return os.getenv("EMPLOITOGO_INFO_API", "0") != "1"
+
     def get_listing_urls(self):
         return ["https://www.emploitogo.info/"]
 
+    def get_sitemap_urls(self):
+        # Sitemap natif WordPress (index)
+        return ["https://www.emploitogo.info/wp-sitemap.xml"]
+
+    def accept_sitemap(self, sitemap_url):
+        # Seuls les articles sont des offres (pas les pages, catégories, auteurs...)
+        return "wp-sitemap-posts-post-" in sitemap_url
+
     def get_listing_schema(self):
         """Schéma de la page de résultats (listing) pour emploitogo.info"""
         return {
             "name": "JobOffersEmploitogoInfo",
             "baseSelector": "article.hentry",
             "baseFields": [
-                {"name": "url", "selector": "a.entry-image-link, h2.entry-title a", "type": "attribute", "attribute": "href"}
+                {"name": "url", "selector": "a.entry-image-link, h2.entry-title a", "type": "attribute", "attribute": "href", "required": True}
             ],
             "fields": [
                 {"name": "title", "selector": "h2.entry-title a", "type": "text"},
@@ -31,7 +46,7 @@ class EmploitogoInfoSource(AbstractSource):
             "baseSelector": "body",
             "fields": [
                 # === INFORMATIONS PRINCIPALES ===
-                {"name": "title", "selector": "h1.entry-title, h1.page-title, h1", "type": "text"},
+                {"name": "title", "selector": "h1.entry-title, h1.page-title, h1", "type": "text", "required": True},
                 {"name": "date_posted", "selector": ".entry-meta .meta-date, .post-date, .entry-date", "type": "text"},
                 
                 # === DESCRIPTION COMPLÈTE ===
@@ -189,8 +204,8 @@ class EmploitogoInfoSource(AbstractSource):
 
     def get_next_page_url(self, page_html, current_url):
         # Extraction de l'URL de la page suivante à partir du HTML (pagination)
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(page_html, "html.parser")
+        from crawler.utils.parser_backend import make_soup
+        soup = make_soup(page_html)
         next_link = soup.select_one("a.pagi-item.pagi-icon.pagi-item-next")
         if next_link and next_link.has_attr("href"):
             return next_link["href"]
@@ -0,0 +1,77 @@
+import os
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+from crawler.core.source_abc import JsonApiSource
+
+
+class EmploitogoInfoApiSource(JsonApiSource):
+    """
+    emploitogo.info via l'API REST WordPress : 100 articles complets par requête,
+    sans pages de listing ni pages de détail.
+    Activée avec EMPLOITOGO_INFO_API=1 (remplace alors la source HTML du même nom).
+    """
+
+    PER_PAGE = 100
+    html_fields = ("job_description", "excerpt")
+
+    @property
+    def name(self):
+        # Même nom que la source HTML : même état (IDs vus) et mêmes URLs d'offres
+        return "emploitogo_info"
+
+    @property
+    def enabled(self):
+        return os.getenv("EMPLOITOGO_INFO_API", "0") == "1"
+
+    def get_api_urls(self):
+        fields = "id,link,date,modified,title,content,excerpt"
+        return [f"https://www.emploitogo.info/wp-json/wp/v2/posts?per_page={self.PER_PAGE}&page=1&_fields={fields}"]
+
+    def get_field_map(self):
+        return {
+            "url": "link",
+            "title": "title.rendered",
+            "date_posted": "date",
+            "job_description": "content.rendered",
+            "excerpt": "excerpt.rendered",
+            "post_id": "id",
+            "modified": "modified",
+        }
+
+    def get_item_unique_id(self, item_data):
+        return item_data.get("url")
+
+    def get_next_api_url(self, payload, current_url):
+        # Page pleine : il peut en rester une autre (WordPress répond 400 au-delà de la dernière)
+        if not isinstance(payload, list) or len(payload) < self.PER_PAGE:
+            return None
+        parts = urlparse(current_url)
+        query = parse_qs(parts.query)
+        query["page"] = [str(int(query.get("page", ["1"])[0]) + 1)]
+        return urlunparse(parts._replace(query=urlencode(query, doseq=True, safe=",")))
+
+    def normalize_date(self, date_str):
+        # Dates ISO WordPress : "2025-06-24T09:15:00" -> "2025-06-24"
+        if not date_str:
+            return None
+        return date_str[:10]
+
+
+if __name__ == "__main__":
+    # Vérification sur une réponse wp-json enregistrée (à la racine du dépôt, à côté de `detail`)
+    import json
+
+    fixture = os.path.join(os.path.dirname(__file__), "..", "..", "wp-json posts.json")
+    with open(fixture, encoding="utf-8") as f:
+        payload = json.load(f)
+    source = EmploitogoInfoApiSource()
+    offers = source.parse_api_page(payload)
+    assert len(offers) == len(payload), "un élément JSON par offre"
+    for offer in offers:
+        assert offer["url"].startswith("https://www.emploitogo.info/"), offer["url"]
+        assert offer["title"] and "&#" not in offer["title"], offer["title"]
+        assert offer["job_description"] and "<" not in offer["job_description"]
+        assert source.normalize_date(offer["date_posted"]) == offer["date_posted"][:10]
+        assert source.get_item_unique_id(offer) == offer["url"]
+        print(f"✅ {offer['title']} | {offer['date_posted']} | {len(offer['job_description'])} caractères")
+    print(f"Page suivante: {source.get_next_api_url(payload, source.get_api_urls()[0])}")
@@ -1,7 +1,13 @@
 import os
+import asyncio
 import logging
-from typing import Dict, Any
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from supabase import create_client, Client
+from postgrest.types import CountMethod, ReturnMethod
+from crawler.core.metrics import EXPORT_ROWS, EXPORT_SECONDS
+from crawler.core.row_fingerprints import changed_columns, column_hashes, get_row_fingerprints
 from dotenv import load_dotenv
 from dateutil import parser as dateparser
 
@@ -31,10 +37,20 @@ load_dotenv()
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise RuntimeError("SUPABASE_URL et SUPABASE_SERVICE_KEY doivent être définis dans le .env")
+_supabase: Optional[Client] = None
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+def get_supabase_client() -> Client:
+    """
+    Client Supabase du crawler, créé au premier export : le mapping et le
+    BulkItemsCacheWriter avec un client fourni restent importables sans .env.
+    """
+    global _supabase
+    if _supabase is None:
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            raise RuntimeError("SUPABASE_URL et SUPABASE_SERVICE_KEY doivent être définis dans le .env")
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
 
 # Champs standards de la table items_cache
 # Champs standards étendus de la table items_cache (ajout de champs demandés)
@@ -114,22 +130,269 @@ def map_job_offer_to_items_cache(job: Dict[str, Any]) -> Dict[str, Any]:
             mapped[date_field] = _normalize_date(mapped[date_field])
     return mapped
 
+def _fingerprint_namespace(client, table: str) -> str:
+    """Empreintes rangées par projet Supabase et par table."""
+    return f"{getattr(client, 'supabase_url', '')}/{table}"
+
+def _update_changed(client, table: str, partial: Dict[str, Any]) -> bool:
+    """
+    UPDATE des seules colonnes changées d'une ligne déjà écrite.
+    Un upsert partiel serait refusé : Postgres vérifie les NOT NULL (item_provider,
+    source_type, raw_data...) avant de résoudre le conflit.
+    Retourne False si la requête échoue ou si la ligne n'existe plus côté base.
+    """
+    columns = {k: v for k, v in partial.items() if k != "item_id"}
+    try:
+        with EXPORT_SECONDS.time(sink="supabase"):
+            response = client.table(table).update(
+                columns, count=CountMethod.exact, returning=ReturnMethod.minimal
+            ).eq("item_id", partial["item_id"]).execute()
+    except Exception as e:
+        logging.warning(f"[SUPABASE] Update échoué, envoi complet: {partial['item_id']} | {e}")
+        return False
+    if getattr(response, "error", None) is not None:
+        logging.warning(f"[SUPABASE] Update échoué, envoi complet: {partial['item_id']} | {response.error}")
+        return False
+    if getattr(response, "count", None) == 0:
+        logging.info(f"[SUPABASE] Ligne absente côté base, envoi complet: {partial['item_id']}")
+        return False
+    return True
+
 def upsert_job_to_supabase(job: Dict[str, Any]) -> bool:
     """
     Upsert une offre dans la table items_cache.
+    Une offre identique à la dernière version écrite n'est pas renvoyée ; une
+    offre déjà écrite et modifiée n'envoie que les colonnes changées (UPDATE).
     Retourne True si succès, False sinon.
     """
     try:
+        supabase = get_supabase_client()
         mapped = map_job_offer_to_items_cache(job)
+        fingerprints = get_row_fingerprints()
+        send = mapped
+        if fingerprints is not None:
+            namespace = _fingerprint_namespace(supabase, "items_cache")
+            hashes = column_hashes(mapped)
+            stored = fingerprints.get_many(namespace, [mapped['item_id']]).get(mapped['item_id'])
+            send = changed_columns(mapped, hashes, stored)
+            if send is None:
+                logging.info(f"[SUPABASE] Inchangée, upsert ignoré: {mapped.get('item_id')}")
+                return True
+        if send is not mapped and _update_changed(supabase, "items_cache", send):
+            logging.info(f"[SUPABASE] Update OK: {mapped.get('item_id')}")
+            fingerprints.put_many(namespace, {mapped['item_id']: hashes})
+            return True
         response = supabase.table("items_cache").upsert(mapped).execute()
         # La lib Supabase renvoie un objet avec `.data` et `.error`.
         # On considère que l'upsert est réussi s'il n'y a pas d'erreur.
         if getattr(response, "error", None) is None:
             logging.info(f"[SUPABASE] Upsert OK: {mapped.get('item_id')}")
+            if fingerprints is not None:
+                fingerprints.put_many(namespace, {mapped['item_id']: hashes})
             return True
         else:
             logging.error(f"[SUPABASE] Upsert FAIL: {mapped.get('item_id')} | Error: {response.error}")
             return False
     except Exception as e:
         logging.error(f"[SUPABASE] Exception upsert {job.get('item_id')}: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+class BulkItemsCacheWriter:
+    """
+    Upserts groupés dans items_cache : une requête pour `batch_size` lignes au lieu d'une par offre.
+
+    - les lignes sont accumulées puis envoyées par lot quand le lot est plein ou
+      que `flush_interval` secondes se sont écoulées (SUPABASE_BATCH_SIZE / SUPABASE_FLUSH_SECONDS)
+    - retour minimal (pas de relecture des lignes écrites)
+    - un lot regroupe des lignes ayant les mêmes colonnes, pour ne jamais écraser une
+      colonne absente par NULL ; un même item_id n'apparaît qu'une fois par lot
+    - si un lot échoue, ses lignes sont réessayées une par une : le résultat est
+      connu par ligne et transmis au callback `on_result(ok)` de chaque ajout
+    - détection de changement (row_fingerprints) : une ligne identique à la
+      dernière écrite est ignorée, une ligne modifiée n'envoie que ses colonnes
+      changées par un UPDATE ciblé ; les lignes inconnues sont upsertées complètes
+
+    Utilisable en contexte synchrone (`with`) ou asynchrone (`async with`) : le
+    flush final est fait à la sortie. En mode asynchrone, l'envoi se fait dans un
+    thread et un flush périodique tourne en tâche de fond.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 client: Optional[Client] = None, table: str = "items_cache", on_conflict: str = ""):
+        self.batch_size = batch_size or int(os.getenv("SUPABASE_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval or float(os.getenv("SUPABASE_FLUSH_SECONDS", "5"))
+        self.client = client or get_supabase_client()
+        self.table = table
+        # Colonne de conflit explicite (ex. "item_id") pour des upserts idempotents
+        self.on_conflict = on_conflict
+        # Empreintes des lignes déjà écrites, par base et par table (CRAWL_CHANGE_DETECTION=0 pour désactiver)
+        self.fingerprints = get_row_fingerprints()
+        self.namespace = _fingerprint_namespace(self.client, table)
+        self._entries: List[Tuple[Dict[str, Any], Optional[Callable[[bool], None]]]] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self.stats = {"rows": 0, "batches": 0, "ok": 0, "failed": 0, "row_fallbacks": 0,
+                      "unchanged": 0, "partial": 0, "update_fallbacks": 0}
+
+    # --- Accumulation ---
+
+    def add(self, job: Dict[str, Any], on_result: Optional[Callable[[bool], None]] = None) -> None:
+        """Ajoute une offre du crawler (mappée vers items_cache)."""
+        self.add_row(map_job_offer_to_items_cache(job), on_result)
+
+    def add_row(self, row: Dict[str, Any], on_result: Optional[Callable[[bool], None]] = None) -> None:
+        """Ajoute une ligne déjà au format items_cache ; flush synchrone si le lot est prêt."""
+        self._entries.append((row, on_result))
+        if self._due():
+            self.flush()
+
+    async def add_async(self, job: Dict[str, Any], on_result: Optional[Callable[[bool], None]] = None) -> None:
+        await self.add_row_async(map_job_offer_to_items_cache(job), on_result)
+
+    async def add_row_async(self, row: Dict[str, Any], on_result: Optional[Callable[[bool], None]] = None) -> None:
+        self._entries.append((row, on_result))
+        if self._due():
+            await self.flush_async()
+
+    def _due(self) -> bool:
+        return bool(self._entries) and (
+            len(self._entries) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    # --- Envoi ---
+
+    def flush(self) -> int:
+        """Envoie les lignes en attente ; retourne le nombre de lignes écrites."""
+        entries, self._entries = self._entries, []
+        self._last_flush = time.monotonic()
+        return self._report(entries, self._write(entries))
+
+    async def flush_async(self) -> int:
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            entries, self._entries = self._entries, []
+            self._last_flush = time.monotonic()
+            if not entries:
+                return 0
+            # Requêtes HTTP bloquantes hors de la boucle ; callbacks dans la boucle
+            results = await asyncio.to_thread(self._write, entries)
+            return self._report(entries, results)
+
+    def _report(self, entries, results: List[bool]) -> int:
+        for (row, on_result), ok in zip(entries, results):
+            if on_result is not None:
+                try:
+                    on_result(ok)
+                except Exception as e:
+                    logging.error(f"[SUPABASE] Callback en erreur pour {row.get('item_id')}: {e}")
+        return sum(results)
+
+    def _write(self, entries) -> List[bool]:
+        """Écrit les lignes par lots homogènes ; retourne le résultat de chaque entrée."""
+        if not entries:
+            return []
+        with self._lock:
+            # Dernière version de chaque item_id ; les doublons partagent son résultat
+            latest: Dict[Any, int] = {}
+            for index, (row, _) in enumerate(entries):
+                latest[row.get("item_id")] = index
+            status: Dict[int, bool] = {}
+            # Détection de changement : lignes inchangées ignorées, colonnes modifiées seules envoyées
+            to_send: Dict[int, Dict[str, Any]] = {}
+            hashes: Dict[int, Dict[str, str]] = {}
+            stored = self.fingerprints.get_many(self.namespace, latest) if self.fingerprints else {}
+            for index in latest.values():
+                row = entries[index][0]
+                if self.fingerprints is None:
+                    to_send[index] = row
+                    continue
+                hashes[index] = column_hashes(row)
+                send = changed_columns(row, hashes[index], stored.get(row.get("item_id")))
+                if send is None:
+                    status[index] = True
+                    self.stats["unchanged"] += 1
+                    continue
+                if send is not row:
+                    # Ligne déjà écrite : UPDATE des colonnes changées, upsert complet si elle a disparu
+                    self.stats["partial"] += 1
+                    if _update_changed(self.client, self.table, send):
+                        status[index] = True
+                        to_send[index] = send
+                        continue
+                    self.stats["update_fallbacks"] += 1
+                to_send[index] = row
+
+            groups: Dict[frozenset, List[int]] = {}
+            for index, send in to_send.items():
+                if index not in status:
+                    groups.setdefault(frozenset(send), []).append(index)
+            for indexes in groups.values():
+                for start in range(0, len(indexes), self.batch_size):
+                    chunk = indexes[start:start + self.batch_size]
+                    ok = self._upsert([to_send[i] for i in chunk])
+                    if ok:
+                        for i in chunk:
+                            status[i] = True
+                    else:
+                        # Lot refusé : on isole les lignes fautives
+                        self.stats["row_fallbacks"] += len(chunk)
+                        for i in chunk:
+                            status[i] = self._upsert([to_send[i]])
+            if self.fingerprints is not None:
+                self.fingerprints.put_many(self.namespace, {
+                    entries[i][0]["item_id"]: hashes[i] for i in to_send if status[i]
+                })
+            results = [status[latest[row.get("item_id")]] for row, _ in entries]
+            self.stats["rows"] += len(entries)
+            self.stats["ok"] += sum(results)
+            self.stats["failed"] += len(results) - sum(results)
+            EXPORT_ROWS.inc(sum(results), sink="supabase", outcome="ok")
+            EXPORT_ROWS.inc(len(results) - sum(results), sink="supabase", outcome="failed")
+            return results
+
+    def _upsert(self, rows: List[Dict[str, Any]]) -> bool:
+        self.stats["batches"] += 1
+        try:
+            with EXPORT_SECONDS.time(sink="supabase"):
+                response = self.client.table(self.table).upsert(
+                    rows, returning=ReturnMethod.minimal, on_conflict=self.on_conflict
+                ).execute()
+            if getattr(response, "error", None) is None:
+                logging.info(f"[SUPABASE] Upsert groupé OK: {len(rows)} lignes")
+                return True
+            logging.error(f"[SUPABASE] Upsert groupé FAIL ({len(rows)} lignes) | Error: {response.error}")
+            return False
+        except Exception as e:
+            ids = rows[0].get('item_id') if len(rows) == 1 else f"{len(rows)} lignes"
+            logging.error(f"[SUPABASE] Exception upsert groupé {ids}: {e}")
+            return False
+
+    # --- Contextes ---
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    async def __aenter__(self):
+        self._ticker = asyncio.create_task(self._flush_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        await self.flush_async()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._entries and time.monotonic() - self._last_flush >= self.flush_interval:
+                await self.flush_async()
@@ -0,0 +1,68 @@
+"""
+Contexte de document partagé par les étapes du pipeline
+
+Une page de détail est parsée une seule fois : l'arbre, le texte brut et le
+texte normalisé (minuscules, sans accents) sont calculés à la demande puis
+réutilisés par l'extraction, le nettoyage, la classification, la géolocalisation
+et l'extraction intelligente.
+"""
+
+from typing import Dict, Optional
+
+from crawler.utils.parser_backend import make_soup
+
+# Accents supprimés pour la recherche de mots-clés
+ACCENT_TABLE = str.maketrans({
+    'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
+    'à': 'a', 'â': 'a', 'ä': 'a',
+    'ô': 'o', 'ö': 'o',
+    'ù': 'u', 'û': 'u', 'ü': 'u',
+    'ç': 'c', 'ñ': 'n'
+})
+
+
+def normalize_text(text: str) -> str:
+    """Met en minuscules et supprime les accents."""
+    return text.lower().translate(ACCENT_TABLE)
+
+
+class DocumentContext:
+    """Arbre, texte brut et texte normalisé d'un document, calculés une seule fois."""
+
+    def __init__(self, html=None, soup=None):
+        self.html = html
+        self._soup = soup
+        self._text: Optional[str] = None
+        self._normalized_text: Optional[str] = None
+        self._normalized_values: Dict[str, str] = {}
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = make_soup(self.html or "")
+        return self._soup
+
+    @property
+    def text(self) -> str:
+        """Texte brut de la page (`soup.get_text()`)."""
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+    @property
+    def normalized_text(self) -> str:
+        """Texte brut de la page, normalisé."""
+        if self._normalized_text is None:
+            self._normalized_text = normalize_text(self.text)
+        return self._normalized_text
+
+    def normalized(self, value) -> str:
+        """
+        Version normalisée d'une valeur de champ (titre, description...),
+        mémorisée pour que chaque annotateur ne la recalcule pas.
+        """
+        value = f"{value}"
+        normalized = self._normalized_values.get(value)
+        if normalized is None:
+            normalized = self._normalized_values[value] = normalize_text(value)
+        return normalized
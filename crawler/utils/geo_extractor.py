@@ -59,12 +59,13 @@ class GeoExtractor:
         """Initialise l'extracteur de géolocalisation"""
         pass
     
-    def extract_location_info(self, text: str) -> Dict[str, any]:
+    def extract_location_info(self, text: str, normalized_text: Optional[str] = None) -> Dict[str, any]:
         """
         Extrait les informations de localisation d'un texte
         
         Args:
             text: Texte à analyser (titre + description)
+            normalized_text: Texte déjà normalisé (DocumentContext), évite de le recalculer
             
         Returns:
             Dict avec city, region, coordinates, is_remote, raw_location
@@ -72,7 +73,10 @@ class GeoExtractor:
         if not text:
             return self._empty_location()
         
-        text_clean = self._normalize_text(text.lower())
+        if normalized_text is not None:
+            text_clean = normalized_text
+        else:
+            text_clean = self._normalize_text(text.lower())
         
         # 1. Détecter le télétravail
         is_remote = self._detect_remote_work(text_clean)
@@ -5,10 +5,14 @@ Module de nettoyage HTML pour le crawler
 import re
 from html import unescape
 try:
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, CData, NavigableString, Tag
+    from crawler.utils.parser_backend import make_soup
 except ImportError:
     BeautifulSoup = None
 
+# Balises dont le contenu n'est jamais du texte utile
+SKIPPED_TAGS = ('script', 'style', 'meta', 'link', 'head')
+
 def clean_html_content(html_content):
     """
     Nettoie le contenu HTML selon les bonnes pratiques
@@ -32,10 +36,10 @@ def clean_html_content(html_content):
     
     try:
         # Utiliser BeautifulSoup pour un nettoyage robuste
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content)
         
         # Supprimer scripts, styles, et autres éléments indésirables
-        for element in soup(['script', 'style', 'meta', 'link', 'head']):
+        for element in soup(list(SKIPPED_TAGS)):
             element.decompose()
         
         # Extraire le texte propre
@@ -54,6 +58,30 @@ def clean_html_content(html_content):
         text = re.sub(r'\s+', ' ', text).strip()
         return text
 
+def _visible_strings(element):
+    for child in element.children:
+        if isinstance(child, Tag):
+            if child.name not in SKIPPED_TAGS:
+                yield from _visible_strings(child)
+        elif type(child) in (NavigableString, CData):
+            yield child
+
+def clean_element_text(element):
+    """
+    Équivalent de clean_html_content pour un élément déjà parsé
+    
+    Le texte est lu directement dans l'arbre partagé (DocumentContext), sans
+    sérialiser ni reparser le fragment et sans modifier l'arbre.
+    
+    Args:
+        element (Tag): Élément BeautifulSoup
+        
+    Returns:
+        str: Texte propre sans balises HTML
+    """
+    text = ' '.join(_visible_strings(element))
+    return re.sub(r'\s+', ' ', text).strip()
+
 def extract_plain_text(html_or_text):
     """
     Extrait le texte brut d'un contenu HTML ou texte
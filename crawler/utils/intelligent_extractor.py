@@ -18,6 +18,7 @@ Usage: from crawler.utils.intelligent_extractor import IntelligentExtractor
 import re
 from typing import Dict, List, Optional, Any
 from bs4 import BeautifulSoup
+from crawler.utils.document import DocumentContext
 
 class IntelligentExtractor:
     """Extracteur intelligent pour récupérer toutes les données disponibles"""
@@ -63,15 +64,23 @@ class IntelligentExtractor:
             r"(?:tel|téléphone|phone)\s*:?\s*((?:\+228|228)?\s*\d{2}\s*\d{2}\s*\d{2}\s*\d{2})"
         ]
 
-    def extract_all_data(self, html_content: str, existing_data: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Extrait intelligemment toutes les données disponibles du HTML"""
+    def extract_all_data(self, html_content: str, existing_data: Dict[str, Any] = None,
+                         document: Optional[DocumentContext] = None) -> Dict[str, Any]:
+        """
+        Extrait intelligemment toutes les données disponibles du HTML
+        
+        Si un DocumentContext est fourni, son arbre et son texte sont réutilisés
+        au lieu de reparser `html_content`.
+        """
         
         if existing_data is None:
             existing_data = {}
         
-        # Analyser le HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        text_content = soup.get_text()
+        # Analyser le HTML (une seule fois par document)
+        if document is None:
+            document = DocumentContext(html_content)
+        soup = document.soup
+        text_content = document.text
         
         # Extraire toutes les données
         extracted_data = {
@@ -4,7 +4,7 @@ Classificateur intelligent pour distinguer les types d'offres
 """
 
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class JobClassifier:
     """Classifie automatiquement les offres selon leur contenu"""
@@ -60,7 +60,8 @@ class JobClassifier:
         """Initialise le classificateur"""
         pass
     
-    def classify_offer(self, title: str, description: str, company_name: str = "") -> str:
+    def classify_offer(self, title: str, description: str, company_name: str = "",
+                       normalized_text: Optional[str] = None) -> str:
         """
         Classifie une offre selon son contenu
         
@@ -68,13 +69,17 @@ class JobClassifier:
             title: Titre de l'offre
             description: Description complète
             company_name: Nom de l'entreprise
+            normalized_text: Texte déjà normalisé (DocumentContext), évite de le recalculer
             
         Returns:
             str: Catégorie détectée ('job', 'scholarship', 'internship', etc.)
         """
         # Nettoyer et normaliser le texte
-        text = f"{title} {description} {company_name}".lower()
-        text = self._normalize_text(text)
+        if normalized_text is not None:
+            text = normalized_text
+        else:
+            text = f"{title} {description} {company_name}".lower()
+            text = self._normalize_text(text)
         
         # Scores par catégorie
         scores = {}
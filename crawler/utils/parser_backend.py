@@ -0,0 +1,54 @@
+"""
+Backend de parsing HTML pour l'extraction
+
+Tous les modules construisent leurs arbres BeautifulSoup via `make_soup`, ce
+qui permet de choisir le parseur par configuration (CRAWL_HTML_PARSER) :
+- "auto" (défaut) : lxml s'il est installé, sinon html.parser
+- "lxml"          : parseur C de lxml, nettement plus rapide sur les grosses pages
+- "html.parser"   : parseur pur Python de la bibliothèque standard (fallback)
+
+Les schémas reposent sur soupsieve (`:has`, `:-soup-contains`...) : les backends
+restent donc des tree builders BeautifulSoup pour garder la même API d'extraction.
+"""
+
+import os
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+SUPPORTED_PARSERS = ("lxml", "html.parser")
+
+_parser_name: Optional[str] = None
+
+
+def _lxml_available() -> bool:
+    try:
+        import lxml  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_parser_name() -> str:
+    """Nom du tree builder BeautifulSoup retenu (résolu une fois par processus)."""
+    global _parser_name
+    if _parser_name is None:
+        wanted = os.getenv("CRAWL_HTML_PARSER", "auto").strip().lower()
+        if wanted in ("auto", "lxml"):
+            if _lxml_available():
+                _parser_name = "lxml"
+            else:
+                if wanted == "lxml":
+                    print("[WARN] lxml non installé, repli sur html.parser")
+                _parser_name = "html.parser"
+        elif wanted in SUPPORTED_PARSERS:
+            _parser_name = wanted
+        else:
+            print(f"[WARN] CRAWL_HTML_PARSER inconnu '{wanted}', repli sur html.parser")
+            _parser_name = "html.parser"
+    return _parser_name
+
+
+def make_soup(markup) -> BeautifulSoup:
+    """Parse `markup` (str ou bytes) avec le backend configuré."""
+    return BeautifulSoup(markup, get_parser_name())
@@ -1,8 +1,8 @@
 import os
-import requests
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from crawler.core.http_client import get_requests_session, request_timeout
 
 # Charger les variables d'environnement (.env)
 load_dotenv()
@@ -21,7 +21,7 @@ def fetch_job_details(job_id):
         "X-RapidAPI-Host": "jsearch.p.rapidapi.com"
     }
     params = {"job_id": job_id}
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
+    resp = get_requests_session().get(url, headers=headers, params=params, timeout=request_timeout())
     resp.raise_for_status()
     return resp.json()
 
@@ -2,6 +2,7 @@ from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 from jsearch_ingestion.main import fetch_and_transform_jobs
+from crawler.supabase_export import BulkItemsCacheWriter
 
 # Charger les variables d'environnement (.env)
 load_dotenv()
@@ -13,12 +14,13 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 def export_jobs_to_supabase():
     jobs = fetch_and_transform_jobs("emploi Togo", country="TG", page=1, num_pages=2)
-    for job in jobs:
-        try:
-            response = supabase.table("items_cache").upsert(job).execute()
-            print(f"Upserted: {job['item_id']} | Response: {response}")
-        except Exception as e:
-            print(f"Erreur lors de l'upsert de {job['item_id']}: {e}")
+    # Les jobs sont déjà au format items_cache : upserts groupés, résultat par ligne
+    with BulkItemsCacheWriter(client=supabase) as writer:
+        for job in jobs:
+            writer.add_row(job, on_result=lambda ok, item_id=job['item_id']: print(
+                f"Upserted: {item_id}" if ok else f"Erreur lors de l'upsert de {item_id}"
+            ))
+    print(f"Export terminé: {writer.stats}")
 
 if __name__ == "__main__":
     export_jobs_to_supabase() 
\ No newline at end of file
@@ -4,8 +4,8 @@ load_dotenv()
 import os
 from .config import get_jsearch_api_key
 from .transform import transform_jsearch_job
-import requests
 import json
+from crawler.core.http_client import get_requests_session, request_timeout
 
 def fetch_and_transform_jobs(query, country="fr", page=1, num_pages=1):
     api_key = get_jsearch_api_key()
@@ -20,7 +20,7 @@ def fetch_and_transform_jobs(query, country="fr", page=1, num_pages=1):
         "page": page,
         "num_pages": num_pages
     }
-    resp = requests.get(url, headers=headers, params=params, timeout=30)
+    resp = get_requests_session().get(url, headers=headers, params=params, timeout=request_timeout())
     resp.raise_for_status()
     data = resp.json()
     jobs = [transform_jsearch_job(j) for j in data.get("data", [])]